@@ -0,0 +1,179 @@
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, json, jsonify, request, stream_with_context
+from flask.json import JSONEncoder
+
+from autocomplete import AUTOCOMPLETE_TYPES, completer
+from cache import cache
+from facets import BROWSE, browse
+from logs import request_log
+from loaders import load_venue_detail, load_artist_detail, iter_entities, iter_shows
+from models import db, Venue, Artist, Show, as_utc, pool_stats
+from pagination import request_page
+from profiling import profiler
+from scheduling import schedule
+
+
+class APIJSONEncoder(JSONEncoder):
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return as_utc(o).isoformat()
+        return super(APIJSONEncoder, self).default(o)
+
+
+api = Blueprint('api', __name__, url_prefix='/api')
+api.json_encoder = APIJSONEncoder
+
+
+@api.errorhandler(400)
+def bad_request(error):
+    # abort(400) from shared helpers, such as a bad page cursor.
+    return jsonify({'error': error.description}), 400
+
+
+#  Autocomplete
+#  ----------------------------------------------------------------
+
+@api.route('/autocomplete')
+def autocomplete():
+    type = request.args.get('type', '')
+    prefix = request.args.get('q', '').strip()
+    if type not in AUTOCOMPLETE_TYPES:
+        return jsonify({'error': 'type must be one of: ' + ', '.join(sorted(AUTOCOMPLETE_TYPES))}), 400
+    if not prefix:
+        return jsonify({'data': []})
+    results = completer(type).lookup(prefix, current_app.config['AUTOCOMPLETE_LIMIT'])
+    return jsonify({'data': results})
+
+
+#  Browse
+#  ----------------------------------------------------------------
+
+@api.route('/browse/<kind>')
+def browse_listing(kind):
+    if kind not in BROWSE:
+        return jsonify({'error': 'kind must be one of: ' + ', '.join(sorted(BROWSE))}), 404
+    selection, error = BROWSE[kind].parse_selection(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    query, facets = browse(kind, selection, current_app.config['BROWSE_WINDOWS'])
+    if kind == 'shows':
+        query = query.options(db.contains_eager(Show.Venue), db.contains_eager(Show.Artist))
+        page = request_page(query, (Show.start_time, Show.id))
+        data = list(map(Show.info, page.items))
+    else:
+        model = BROWSE[kind].model
+        page = request_page(query, (model.id,))
+        data = list(map(model.short_response, page.items))
+    return jsonify({
+        'data': data,
+        'facets': facets,
+        'selection': selection,
+        'next': page.next_cursor,
+        'prev': page.prev_cursor
+    })
+
+
+#  v1
+#  ----------------------------------------------------------------
+
+def stream_json_array(items):
+    # Writes the array one element at a time instead of building it first.
+    def generate():
+        yield '['
+        for position, item in enumerate(items):
+            yield (',' if position else '') + json.dumps(item, cls=APIJSONEncoder)
+        yield ']'
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+def not_found():
+    return jsonify({'error': 'not found'}), 404
+
+
+@api.route('/v1/venues')
+def list_venues():
+    return stream_json_array(iter_entities(Venue, current_app.config['API_STREAM_BATCH_SIZE']))
+
+
+@api.route('/v1/venues/<int:venue_id>')
+def get_venue(venue_id):
+    venue = load_venue_detail(venue_id)
+    return jsonify(venue) if venue else not_found()
+
+
+@api.route('/v1/artists')
+def list_artists():
+    return stream_json_array(iter_entities(Artist, current_app.config['API_STREAM_BATCH_SIZE']))
+
+
+@api.route('/v1/artists/<int:artist_id>')
+def get_artist(artist_id):
+    artist = load_artist_detail(artist_id)
+    return jsonify(artist) if artist else not_found()
+
+
+@api.route('/v1/shows')
+def list_shows():
+    return stream_json_array(iter_shows(current_app.config['API_STREAM_BATCH_SIZE']))
+
+
+@api.route('/v1/shows/<int:show_id>')
+def get_show(show_id):
+    show = Show.query.options(db.joinedload(Show.Venue), db.joinedload(Show.Artist)).get(show_id)
+    return jsonify(show.info()) if show else not_found()
+
+
+@api.route('/v1/shows/batch', methods=['POST'])
+def schedule_shows():
+    # Takes a JSON array of {artist_id, venue_id, start_time, duration} (or
+    # {"shows": [...]}); ?dry_run=1 only checks them.
+    rows = request.get_json(silent=True)
+    if isinstance(rows, dict):
+        rows = rows.get('shows')
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        return jsonify({'error': 'expected a JSON array of shows'}), 400
+    limit = current_app.config['SCHEDULE_BATCH_LIMIT']
+    if len(rows) > limit:
+        return jsonify({'error': 'at most %d shows per batch' % limit}), 413
+    results = schedule(rows, dry_run=request.args.get('dry_run', '').lower() in ('1', 'true'))
+    rejected = sum(1 for result in results if result['status'] == 'rejected')
+    return jsonify({
+        'accepted': len(results) - rejected,
+        'rejected': rejected,
+        'results': results
+    })
+
+
+#  Cache
+#  ----------------------------------------------------------------
+
+@api.route('/cache/stats')
+def cache_stats():
+    return jsonify(cache.stats)
+
+
+#  Database
+#  ----------------------------------------------------------------
+
+@api.route('/pool/stats')
+def database_pool_stats():
+    return jsonify(pool_stats())
+
+
+#  Profiling
+#  ----------------------------------------------------------------
+
+@api.route('/profile/stats')
+def profile_stats():
+    # Totals per endpoint for this worker process since it started.
+    return jsonify(profiler.totals())
+
+
+#  Logging
+#  ----------------------------------------------------------------
+
+@api.route('/log/stats')
+def log_stats():
+    return jsonify(request_log.stats())
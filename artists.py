@@ -0,0 +1,174 @@
+from flask import Blueprint, render_template, request, flash, redirect, url_for
+from sqlalchemy.exc import SQLAlchemyError
+
+from cache import cache
+from conditional import conditional, artists_validators, artist_validators
+from feeds import artist_calendar
+from forms import ArtistForm
+from loaders import load_artist_detail
+from models import db, Venue, Artist, Show, Genre, filter_by_genre, next_show_start
+from pagination import request_page
+from routing import replica_reads
+from search import search
+
+artists = Blueprint('artists', __name__)
+
+
+#  Artists
+#  ----------------------------------------------------------------
+
+@artists.route('/artists')
+@conditional(artists_validators)
+@cache.page(lambda: ['artists'])
+def index():
+    # TODO: replace with real data returned from querying the database
+    query = Artist.query
+    if request.args.get('genre'):
+        query = filter_by_genre(query, Artist, request.args['genre'])
+    page = request_page(query, (Artist.id,))
+    return render_template('pages/artists.html', artists=page.items, page=page)
+
+
+@artists.route('/artists/search', methods=['POST'])
+@replica_reads
+def search_artists():
+    # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
+    # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+    # search for "band" should return "The Wild Sax Band".
+    artist_response = search(Artist, request.form['search_term'])
+    artist_list = list(map(Artist.short_response, artist_response))
+    response = {
+        'count': len(artist_list),
+        'data': artist_list
+    }
+    return render_template('pages/search_artists.html', results=response,
+                           search_term=request.form.get('search_term', ''))
+
+
+@artists.route('/artists/<int:artist_id>')
+@conditional(artist_validators)
+@cache.page(lambda artist_id: ['artist:%d' % artist_id],
+            expires=lambda artist_id: next_show_start(Show.artist_id, artist_id))
+def show_artist(artist_id):
+    # shows the artist page with the given artist_id
+    artist_info = load_artist_detail(artist_id)
+    if artist_info:
+        return render_template('pages/show_artist.html', artist=artist_info)
+    return render_template('errors/404.html')
+
+
+@artists.route('/artists/<int:artist_id>/shows.ics')
+@conditional(artist_validators)
+def artist_shows_calendar(artist_id):
+    # iCalendar feed of the artist's shows; ?from= / ?to= narrow the window
+    return artist_calendar(artist_id)
+
+
+#  Update
+#  ----------------------------------------------------------------
+
+@artists.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+    form = ArtistForm()
+    artis_query = Artist.query.get(artist_id)
+    if artis_query:
+        artist_info = Artist.info(artis_query)
+        form.name.data = artist_info['name']
+        form.genres.data = artist_info['genres']
+        form.state.data = artist_info['state']
+        form.city.data = artist_info['city']
+        form.facebook_link.data = artist_info['facebook_link']
+        form.image_link.data = artist_info['image_link']
+        form.phone.data = artist_info['phone']
+        form.website.data = artist_info['website']
+        form.seeking_venue.data = artist_info['seeking_venue']
+        form.seeking_description.data = artist_info['seeking_description']
+        # TODO: populate form with fields from artist with ID <artist_id>
+        return render_template('forms/edit_artist.html', form=form, artist=artist_info)
+    return render_template('errors/404.html')
+
+
+@artists.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+    # TODO: take values from the form submitted, and update existing
+    # artist record with ID <artist_id> using the new attributes
+    artist_query = Artist.query.get(artist_id)
+
+    seeking_venue = False
+    venue = request.form.get('seeking_venue')
+    if venue == "off":
+        seeking_venue = False
+    elif venue == "on":
+        seeking_venue = True
+    setattr(artist_query, 'name', request.form['name'])
+    setattr(artist_query, 'website', request.form['website'])
+    setattr(artist_query, 'facebook_link', request.form['facebook_link'])
+    setattr(artist_query, 'image_link', request.form['image_link'])
+    setattr(artist_query, 'seeking_venue', seeking_venue)
+    setattr(artist_query, 'seeking_description', request.form['seeking_description'])
+    setattr(artist_query, 'phone', request.form['phone'])
+    setattr(artist_query, 'state', request.form['state'])
+    setattr(artist_query, 'city', request.form['city'])
+    setattr(artist_query, 'genres', Genre.lookup(request.form.getlist('genres')))
+    Venue.update(artist_query)
+    return redirect(url_for('artists.show_artist', artist_id=artist_id))
+
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@artists.route('/artists/create', methods=['GET'])
+def create_artist_form():
+    form = ArtistForm()
+    return render_template('forms/new_artist.html', form=form)
+
+
+@artists.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+    # called upon submitting the new artist listing form
+    # TODO: insert form data as a new Venue record in the db, instead
+    # TODO: modify data to be the data object returned from db insertion
+    seeking_venue = False
+    venue = request.form.get('seeking_venue')
+    if venue == "on":
+        seeking_venue = True
+    elif venue == "off":
+        seeking_venue = False
+    try:
+        artist = Artist(
+            name=request.form['name'],
+            city=request.form['city'],
+            state=request.form['state'],
+            phone=request.form['phone'],
+            genres=Genre.lookup(request.form.getlist('genres')),
+            image_link=request.form['image_link'],
+            seeking_venue=seeking_venue,
+            website=request.form['website'],
+            facebook_link=request.form['facebook_link'],
+            seeking_description=request.form['seeking_description']
+        )
+        artist.insert()
+        # on successful db insert, flash success
+        flash('Artist ' + request.form['name'] + ' was successfully listed!')
+    except SQLAlchemyError:
+
+        # TODO: on unsuccessful db insert, flash an error instead.
+        flash('An error occurred. Artist ' + request.form['name'] + ' could not be listed.')
+    return render_template('pages/home.html')
+
+
+@artists.route('/delete_artist/<int:artist_id>')
+def delete_artist(artist_id):
+    # TODO: Complete this endpoint for taking a venue_id, and using
+    # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+    try:
+        del_venue = Artist.query.filter_by(id=artist_id).first()
+        del_venue.delete()
+    except:
+        db.session.rollback()
+    finally:
+        db.session.close()
+
+    # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+    # clicking that button delete it from the db then redirect the user to the homepage
+    return redirect(url_for('index'))
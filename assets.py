@@ -0,0 +1,239 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+
+import click
+from flask import Blueprint, Response, abort, current_app, request, send_from_directory, url_for
+from flask.cli import with_appcontext
+
+
+# ----------------------------------------------------------------------------#
+# Static assets.
+# ----------------------------------------------------------------------------#
+#
+# `flask assets` concatenates and minifies the stylesheets and scripts of
+# layouts/main.html into the BUNDLES below, copies the FILES, and writes each
+# under a name carrying a hash of its content to static/dist, next to a .gz
+# and (with the brotli package installed) a .br copy. manifest.json maps
+# every logical name to its hashed file, and asset_url() in a template looks
+# it up. Since a hashed file never changes, it is served with a one-year
+# immutable Cache-Control, pre-compressed when the client accepts it.
+#
+# Until the command has run, asset_url() points at the plain static file, or
+# for a bundle, at a concatenation built on every request: good enough for
+# development, with no build step. After it has, that concatenation is only
+# served in debug mode.
+
+BUNDLES = {
+    'site.css': ['css/bootstrap.min.css', 'css/layout.main.css', 'css/main.css', 'css/main.responsive.css',
+                 'css/main.quickfix.css'],
+    'head.js': ['js/libs/modernizr-2.8.2.min.js', 'js/libs/moment.min.js'],
+    # Deferred, so it runs after the page is parsed and jQuery has loaded.
+    'site.js': ['js/script.js', 'js/libs/bootstrap-3.1.1.min.js', 'js/plugins.js'],
+}
+FILES = ['js/libs/jquery-1.11.1.min.js', 'js/libs/respond-1.4.2.min.js', 'img/front-splash.jpg']
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = ('.css', '.js', '.svg')
+MAX_AGE = 365 * 24 * 3600
+
+assets = Blueprint('assets', __name__)
+
+
+#  Minifying
+#  ----------------------------------------------------------------
+
+CSS_COMMENT = re.compile(r'/\*(?!!).*?\*/', re.S)
+CSS_SPACE = re.compile(r'\s*([{};,>])\s*')
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+SOURCE_MAP = re.compile(r'^\s*//[#@] sourceMappingURL=.*$', re.M)
+
+
+def minify_css(text):
+    # Comments (except /*! licences */) and the whitespace around
+    # punctuation go; a space before ':' is kept, as in `a :hover`.
+    text = CSS_COMMENT.sub('', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = CSS_SPACE.sub(r'\1', text)
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    # Files already shipped minified are left alone. The others only lose
+    # indentation, blank lines and whole-line // comments; line breaks stay,
+    # so semicolon insertion works as before. That is only safe for the two
+    # it is used on today, js/script.js and js/plugins.js: it knows nothing
+    # of strings or /* */ comments, so a line in either that starts with //
+    # would go. Bundle a bigger script with a real minifier instead.
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+def absolute_urls(text, source, static_url):
+    # url()s in a stylesheet are relative to its own directory; the bundle
+    # lives elsewhere, so they are made absolute.
+    def rewrite(match):
+        quote, url = match.groups()
+        if re.match(r'^(/|#|[a-z]+:)', url):
+            return match.group(0)
+        path, rest = re.match(r'^([^?#]*)(.*)$', url).groups()
+        path = posixpath.normpath(posixpath.join(posixpath.dirname(source), path))
+        return 'url(%s%s/%s%s%s)' % (quote, static_url, path, rest, quote)
+    return CSS_URL.sub(rewrite, text)
+
+
+def bundle(static_folder, static_url, name, minify):
+    parts = []
+    for source in BUNDLES[name]:
+        with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+            text = f.read()
+        if name.endswith('.css'):
+            text = absolute_urls(text, source, static_url)
+            parts.append(minify_css(text) if minify else text)
+        else:
+            text = SOURCE_MAP.sub('', text)
+            parts.append(minify_js(text) if minify and not source.endswith('.min.js') else text)
+    # A script that does not end in a semicolon must not run into the next.
+    return (';\n' if name.endswith('.js') else '\n').join(parts).encode()
+
+
+#  Building
+#  ----------------------------------------------------------------
+
+def hashed_name(name, data):
+    base, ext = posixpath.splitext(name)
+    return '%s.%s%s' % (base, hashlib.sha1(data).hexdigest()[:12], ext)
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def build(app):
+    # Writes every bundle and file, and returns the new manifest.
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    dist = os.path.join(app.static_folder, DIST)
+    static_url = app.static_url_path
+    outputs = [(name, bundle(app.static_folder, static_url, name, True)) for name in sorted(BUNDLES)]
+    for name in FILES:
+        with open(os.path.join(app.static_folder, name), 'rb') as f:
+            outputs.append((name, f.read()))
+
+    manifest = {}
+    for name, data in outputs:
+        manifest[name] = hashed_name(name, data)
+        path = os.path.join(dist, manifest[name])
+        write(path, data)
+        if name.endswith(COMPRESSIBLE):
+            write(path + '.gz', gzip.compress(data, 9, mtime=0))
+            if brotli is not None:
+                write(path + '.br', brotli.compress(data))
+    return manifest
+
+
+def built_files(manifest):
+    for name in manifest.values():
+        yield name
+        yield name + '.gz'
+        yield name + '.br'
+
+
+def read_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+@click.command('assets')
+@with_appcontext
+def assets_command():
+    """Build the hashed, minified and compressed static bundles."""
+    app = current_app
+    path = os.path.join(app.static_folder, DIST, MANIFEST)
+    old = read_manifest(path)
+    manifest = build(app)
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+    # The previous build's files go, unless they are still current.
+    for name in set(built_files(old)) - set(built_files(manifest)):
+        if os.path.exists(os.path.join(app.static_folder, DIST, name)):
+            os.remove(os.path.join(app.static_folder, DIST, name))
+
+    dist = os.path.join(app.static_folder, DIST)
+    for name, hashed in sorted(manifest.items()):
+        sizes = ['%d' % os.path.getsize(os.path.join(dist, hashed))]
+        for suffix in ('.gz', '.br'):
+            if os.path.exists(os.path.join(dist, hashed + suffix)):
+                sizes.append('%s %d' % (suffix[1:], os.path.getsize(os.path.join(dist, hashed + suffix))))
+        click.echo('%s -> %s/%s (%s bytes)' % (name, DIST, hashed, ', '.join(sizes)))
+
+
+#  Serving
+#  ----------------------------------------------------------------
+
+def load_manifest():
+    # Read once per process; in debug mode again whenever `flask assets` ran.
+    app = current_app
+    path = os.path.join(app.static_folder, DIST, MANIFEST)
+    cached = app.extensions.get('assets')
+    if cached is None or app.debug:
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        if cached is None or cached[0] != mtime:
+            cached = app.extensions['assets'] = (mtime, read_manifest(path))
+    return cached[1]
+
+
+def asset_url(name):
+    hashed = load_manifest().get(name)
+    if hashed is not None:
+        return url_for('assets.dist', filename=hashed)
+    if name in BUNDLES:
+        return url_for('assets.dist', filename=name)
+    return url_for('static', filename=name)
+
+
+@assets.route('/static/dist/<path:filename>')
+def dist(filename):
+    if filename in BUNDLES:
+        # Not built yet: the plain concatenation, never cached. Once there is
+        # a build, pages link the hashed files, so only a debug app, where
+        # the sources are being edited, still concatenates on request.
+        if load_manifest() and not current_app.debug:
+            abort(404)
+        response = Response(bundle(current_app.static_folder, current_app.static_url_path, filename, False),
+                            mimetype=mimetypes.guess_type(filename)[0])
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    if filename not in load_manifest().values():
+        abort(404)
+
+    directory = os.path.join(current_app.static_folder, DIST)
+    encoding = None
+    for name, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[name] and os.path.exists(os.path.join(directory, filename + suffix)):
+            encoding = name
+            break
+    if encoding is None:
+        response = send_from_directory(directory, filename, cache_timeout=MAX_AGE)
+    else:
+        response = send_from_directory(directory, filename + suffix, cache_timeout=MAX_AGE,
+                                       mimetype=mimetypes.guess_type(filename)[0])
+        response.headers['Content-Encoding'] = encoding
+    if filename.endswith(COMPRESSIBLE):
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = 'public, max-age=%d, immutable' % MAX_AGE
+    return response
@@ -0,0 +1,158 @@
+import bisect
+import re
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+
+from cache import INDEX_TAGS, Watched
+from models import db, Venue, Artist, subscribe
+
+
+# ----------------------------------------------------------------------------#
+# Typeahead.
+# ----------------------------------------------------------------------------#
+#
+# Names live in a sorted in-memory list, one per app and worker. A worker's own
+# writes reach its list through model change events; other workers' writes
+# bump the 'index:venues'/'index:artists' stamps, and the list is loaded again
+# once INDEX_CHECK_SECONDS have passed since it last looked. So a lookup runs
+# at most one query every INDEX_CHECK_SECONDS, and a name written by another
+# worker can be missing from the suggestions for that long.
+
+WORD_START_RE = re.compile(r'\b\w')
+
+
+class PrefixIndex(object):
+    # Every word of a name is a key ("the musical hop", "musical hop", "hop"),
+    # so typing the start of any word finds the name with one bisect.
+
+    def __init__(self):
+        self.keys = []
+        self.names = {}
+
+    def keys_for(self, id, name):
+        name = name.lower()
+        return [(name[match.start():], id) for match in WORD_START_RE.finditer(name)]
+
+    def load(self, rows):
+        # Sorts once rather than inserting every key in place.
+        for id, name in rows:
+            self.names[id] = name or ''
+            self.keys.extend(self.keys_for(id, self.names[id]))
+        self.keys.sort()
+
+    def add(self, id, name):
+        self.remove(id)
+        name = name or ''
+        self.names[id] = name
+        for key in self.keys_for(id, name):
+            bisect.insort(self.keys, key)
+
+    def remove(self, id):
+        name = self.names.pop(id, None)
+        if name is None:
+            return
+        for key in self.keys_for(id, name):
+            position = bisect.bisect_left(self.keys, key)
+            if position < len(self.keys) and self.keys[position] == key:
+                del self.keys[position]
+
+    def lookup(self, prefix, limit):
+        prefix = prefix.lower()
+        results = []
+        position = bisect.bisect_left(self.keys, (prefix,))
+        while position < len(self.keys) and len(results) < limit:
+            key, id = self.keys[position]
+            if not key.startswith(prefix):
+                break
+            if not any(result['id'] == id for result in results):
+                results.append({'id': id, 'name': self.names[id]})
+            position += 1
+        return results
+
+
+class LRUCache(object):
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class Autocomplete(object):
+
+    def __init__(self, model, cache_size, check_seconds):
+        self.model = model
+        self.index = Watched(INDEX_TAGS[model], self.load, check_seconds)
+        self.cache = LRUCache(cache_size)
+        self.cached_index = None
+
+    def load(self):
+        index = PrefixIndex()
+        index.load(db.session.query(self.model.id, self.model.name))
+        return index
+
+    def lookup(self, prefix, limit):
+        key = (prefix.lower(), limit)
+        index = self.index.get()
+        with self.index.lock:
+            if index is not self.cached_index:
+                # Loaded again: the cached results came from the old list.
+                self.cache.clear()
+                self.cached_index = index
+            results = self.cache.get(key)
+            if results is None:
+                results = index.lookup(prefix, limit)
+                self.cache.set(key, results)
+        return results
+
+    def changed(self, action, instance):
+        with self.index.lock:
+            if self.index.value is None:
+                return
+            if action == 'delete':
+                self.index.value.remove(instance.id)
+            else:
+                self.index.value.add(instance.id, instance.name)
+            self.cache.clear()
+
+
+AUTOCOMPLETE_TYPES = {
+    'venue': Venue,
+    'artist': Artist,
+}
+
+
+def completers(app):
+    return app.extensions.setdefault('autocomplete', {})
+
+
+def completer(type):
+    app_completers = completers(current_app)
+    if type not in app_completers:
+        app_completers[type] = Autocomplete(AUTOCOMPLETE_TYPES[type], current_app.config['AUTOCOMPLETE_CACHE_SIZE'],
+                                            current_app.config['INDEX_CHECK_SECONDS'])
+    return app_completers[type]
+
+
+@subscribe
+def update_completers(action, instance):
+    if not has_app_context():
+        return
+    for completer in completers(current_app).values():
+        if isinstance(instance, completer.model):
+            completer.changed(action, instance)
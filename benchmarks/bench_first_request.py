@@ -0,0 +1,95 @@
+"""First-request latency of a fresh worker, with and without compiled templates.
+
+    python benchmarks/bench_first_request.py [--venues N] [--artists N] [--shows N] [--runs N]
+
+Each mode starts new interpreters on the same seeded SQLite database, times
+create_app() and then the first and second request to each page:
+
+    compile    no template cache: every page compiles its templates on first hit
+    bytecode   TEMPLATE_CACHE_DIR filled by `flask compile-templates`
+    preload    the same cache, and TEMPLATE_PRELOAD loads every template in create_app()
+
+The gap between the first and the second request is what a worker pays on
+its first hit to a page after a deploy or a recycle; with preload it is paid
+once in create_app(), which gunicorn's preloaded master does for all workers.
+Medians over --runs processes.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PAGES = ['/', '/venues', '/venues/1', '/artists', '/artists/1', '/shows', '/venues/create', '/artists/1/edit']
+
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+app = create_app('testing')
+timings = {'create_app': time.perf_counter() - started}
+client = app.test_client()
+for page in %r:
+    for round in ('first', 'second'):
+        started = time.perf_counter()
+        response = client.get(page)
+        response.get_data()
+        assert response.status_code == 200, (page, response.status)
+        timings[page + ' ' + round] = time.perf_counter() - started
+print(json.dumps(timings))
+''' % PAGES
+
+
+def run(env):
+    output = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, env=env, check=True,
+                            stdout=subprocess.PIPE).stdout
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--venues', type=int, default=300)
+    parser.add_argument('--artists', type=int, default=1000)
+    parser.add_argument('--shows', type=int, default=10000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='fyyur-first-request-')
+    url = 'sqlite:///%s' % os.path.join(directory, 'bench.db')
+    cache_dir = os.path.join(directory, 'templates')
+    base = dict(os.environ, FYYUR_CONFIG='testing', TEST_DATABASE_URL=url, DATABASE_URL=url)
+    base.pop('DATABASE_REPLICA_URLS', None)
+    base.pop('LOG_FILE', None)
+    subprocess.run([sys.executable, os.path.join(ROOT, 'benchmarks', 'seed.py'), url, '--venues', str(args.venues),
+                    '--artists', str(args.artists), '--shows', str(args.shows)], cwd=ROOT, env=base, check=True)
+    subprocess.run([sys.executable, '-m', 'flask', 'compile-templates'], cwd=ROOT, check=True,
+                   env=dict(base, FLASK_APP='app', TEMPLATE_CACHE_DIR=cache_dir))
+
+    modes = [
+        ('compile', dict(base, TEMPLATE_CACHE_DIR='', TEMPLATE_PRELOAD='0')),
+        ('bytecode', dict(base, TEMPLATE_CACHE_DIR=cache_dir, TEMPLATE_PRELOAD='0')),
+        ('preload', dict(base, TEMPLATE_CACHE_DIR=cache_dir, TEMPLATE_PRELOAD='1')),
+    ]
+    results = {}
+    for mode, env in modes:
+        runs = [run(env) for _ in range(args.runs)]
+        results[mode] = {key: statistics.median(timings[key] for timings in runs) * 1000 for key in runs[0]}
+
+    print('%-18s' % 'ms' + ''.join('%12s' % mode for mode, env in modes))
+    print('%-18s' % 'create_app' + ''.join('%12.1f' % results[mode]['create_app'] for mode, env in modes))
+    totals = {mode: 0.0 for mode, env in modes}
+    for page in PAGES:
+        print('%-18s' % page + ''.join('%5.1f / %4.1f' % (results[mode][page + ' first'], results[mode][page + ' second'])
+                                       for mode, env in modes))
+        for mode, env in modes:
+            totals[mode] += results[mode][page + ' first']
+    print('%-18s' % 'first hits' + ''.join('%12.1f' % totals[mode] for mode, env in modes))
+
+
+if __name__ == '__main__':
+    main()
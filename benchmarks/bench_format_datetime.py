@@ -0,0 +1,63 @@
+"""Per-tile cost of the |datetime filter on a 10k-show page.
+
+    python benchmarks/bench_format_datetime.py [num_shows]
+
+"before" is the original filter (dateutil parse of a string, then
+babel.dates.format_datetime); "after" is formatting.DatetimeFormatter fed the
+native datetimes the Show model now returns.
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import babel.dates
+import dateutil.parser
+
+from formatting import DatetimeFormatter
+
+
+def format_datetime_before(value, format='full'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "d, y H:m"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def show_times(count):
+    # Shows start on the hour or half hour over a year, as real listings do.
+    random.seed(0)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [start + timedelta(days=random.randrange(365), minutes=30 * random.randrange(18, 46))
+            for _ in range(count)]
+
+
+def per_tile(format_tile, values):
+    started = time.perf_counter()
+    for value in values:
+        format_tile(value, 'full')
+    return (time.perf_counter() - started) / len(values) * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    times = show_times(count)
+    strings = [value.strftime('%Y-%m-%d %H:%M:%S') for value in times]
+
+    before = per_tile(format_datetime_before, strings)
+    formatter = DatetimeFormatter()
+    cold = per_tile(formatter, times)
+    warm = per_tile(formatter, times)
+    print('%d shows' % count)
+    print('before:       %7.2f us/tile' % before)
+    print('after (cold): %7.2f us/tile' % cold)
+    print('after (warm): %7.2f us/tile' % warm)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""Throughput and latency of the gunicorn worker models on the seeded dataset.
+
+    python benchmarks/seed.py DATABASE_URL
+    python benchmarks/bench_workers.py DATABASE_URL [--profiles sync,gthread,gevent]
+        [--workers 4] [--threads 4] [--clients 32] [--duration 20]
+
+Each profile of gunicorn.conf.py is started on a free port with the production
+config, warmed up, then driven by --clients keep-alive connections over a mix of
+listing, detail, search and feed requests. Requests/s, latency percentiles and
+errors are printed per profile. The client is Python threads, so on a small
+machine it competes with the server for CPU: run it from another host (or use
+wrk with the same paths) for absolute numbers; the comparison between profiles
+holds either way.
+"""
+import argparse
+import http.client
+import importlib.util
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlencode
+
+from sqlalchemy import create_engine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (weight, method, path); {venue}/{artist} are drawn from the seeded ids.
+REQUESTS = [
+    (20, 'GET', '/venues'),
+    (20, 'GET', '/artists'),
+    (15, 'GET', '/shows'),
+    (15, 'GET', '/venues/{venue}'),
+    (15, 'GET', '/artists/{artist}'),
+    (5, 'POST', '/venues/search'),
+    (5, 'POST', '/artists/search'),
+    (5, 'GET', '/venues/{venue}/shows.ics'),
+]
+SEARCH_TERMS = ['blue', 'the', 'velvet', 'neon hall', 'new york', 'jazz']
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), 1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn did not start on port %d' % port)
+
+
+def client(port, ids, seed, stop, latencies, errors):
+    rng = random.Random(seed)
+    weights = [weight for weight, method, path in REQUESTS]
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    while not stop.is_set():
+        weight, method, path = rng.choices(REQUESTS, weights)[0]
+        path = path.format(venue=rng.choice(ids['venue']), artist=rng.choice(ids['artist']))
+        body, headers = None, {}
+        if method == 'POST':
+            body = urlencode({'search_term': rng.choice(SEARCH_TERMS)})
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        started = time.perf_counter()
+        try:
+            connection.request(method, path, body, headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - started)
+    connection.close()
+
+
+def drive(port, ids, clients, duration):
+    stop = threading.Event()
+    latencies, errors = [], []
+    threads = [threading.Thread(target=client, args=(port, ids, n, stop, latencies, errors)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000 if values else float('nan')
+
+
+def run_profile(profile, args, ids):
+    port = free_port()
+    env = dict(os.environ, FYYUR_CONFIG='production', DATABASE_URL=args.database_url,
+               SECRET_KEY=os.environ.get('SECRET_KEY', 'benchmark'), GUNICORN_PROFILE=profile, PORT=str(port),
+               WEB_CONCURRENCY=str(args.workers), GUNICORN_THREADS=str(args.threads),
+               DB_POOL_SIZE=str(max(args.threads, 5)))
+    # gunicorn 19 has no __main__, so start its console script entry point.
+    server = subprocess.Popen([sys.executable, '-c', 'from gunicorn.app.wsgiapp import run; run()',
+                               '-c', 'gunicorn.conf.py', '--access-logfile', os.devnull, 'wsgi:app'], cwd=ROOT, env=env)
+    try:
+        wait_for(port)
+        drive(port, ids, args.clients, min(3, args.duration))  # warm-up
+        latencies, errors = drive(port, ids, args.clients, args.duration)
+    finally:
+        server.terminate()
+        server.wait()
+    latencies.sort()
+    return {
+        'rps': len(latencies) / args.duration,
+        'p50': percentile(latencies, 0.50),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('database_url')
+    parser.add_argument('--profiles', default='sync,gthread,gevent')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    with engine.connect() as connection:
+        ids = {
+            'venue': [id for id, in connection.execute('SELECT id FROM "Venue"')],
+            'artist': [id for id, in connection.execute('SELECT id FROM "Artist"')],
+        }
+    engine.dispose()
+    if not ids['venue'] or not ids['artist']:
+        raise SystemExit('seed the database first: python benchmarks/seed.py %s' % args.database_url)
+
+    print('%d workers, %d threads (gthread), %d clients, %gs per profile'
+          % (args.workers, args.threads, args.clients, args.duration))
+    print('%-8s %10s %10s %10s %10s %8s' % ('profile', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors'))
+    for profile in args.profiles.split(','):
+        if profile == 'gevent' and not (importlib.util.find_spec('gevent') and importlib.util.find_spec('psycogreen')):
+            print('%-8s skipped: pip install gevent psycogreen' % profile)
+            continue
+        result = run_profile(profile, args, ids)
+        print('%-8s %10.1f %10.1f %10.1f %10.1f %8d' % (profile, result['rps'], result['p50'], result['p95'],
+                                                         result['p99'], result['errors']))
+
+
+if __name__ == '__main__':
+    main()
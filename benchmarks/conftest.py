@@ -0,0 +1,156 @@
+"""Fixtures and the baseline check for the route and start-up benchmarks.
+
+    python -m pytest benchmarks                          # compare with baseline.json
+    python -m pytest benchmarks --update-baseline        # record a new baseline
+    python -m pytest benchmarks --benchmark-disable      # query counts only, one call each
+
+Routes run against BENCH_DATABASE_URL, seeded first if it is empty, or else a
+temporary SQLite database seeded with BENCH_VENUES/BENCH_ARTISTS/BENCH_SHOWS
+(default 300/1000/10000) by seed.py. The app runs with the testing config, so
+the page cache is off and every round renders.
+
+A route fails when it runs more queries than its baseline or its median
+latency is more than --latency-tolerance above it. Query counts hold on any
+machine; latencies only on the one baseline.json was recorded on, so record a
+new baseline when the benchmark machine changes.
+"""
+import json
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Added to every latency limit, so sub-millisecond routes do not fail on noise.
+LATENCY_SLACK_MS = 1.0
+
+results = {}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('fyyur baseline')
+    group.addoption('--update-baseline', action='store_true', help='Write this run to benchmarks/baseline.json.')
+    group.addoption('--latency-tolerance', type=float, default=0.5,
+                    help='Allowed median slowdown over the baseline, as a fraction (default 0.5).')
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    url = os.environ.get('BENCH_DATABASE_URL') or 'sqlite:///%s' % tmp_path_factory.mktemp('bench').joinpath('bench.db')
+    os.environ['FYYUR_CONFIG'] = 'testing'
+    os.environ['TEST_DATABASE_URL'] = url
+    os.environ.pop('DATABASE_REPLICA_URLS', None)
+    from app import create_app
+    from models import db, Venue
+    from seed import seed
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        if db.session.query(Venue.id).first() is None:
+            seed(int(os.environ.get('BENCH_VENUES', 300)), int(os.environ.get('BENCH_ARTISTS', 1000)),
+                 int(os.environ.get('BENCH_SHOWS', 10000)))
+        db.session.remove()
+    return app
+
+
+@pytest.fixture(scope='session')
+def busiest(app):
+    # The venue and artist with the most upcoming shows: the slowest detail
+    # pages. And a show there, for the show detail.
+    from models import Venue, Artist, Show
+    with app.app_context():
+        venue_id = Venue.query.order_by(Venue.upcoming_shows_count.desc(), Venue.id).first().id
+        return {
+            'venue_id': venue_id,
+            'artist_id': Artist.query.order_by(Artist.upcoming_shows_count.desc(), Artist.id).first().id,
+            'show_id': Show.query.filter(Show.venue_id == venue_id).order_by(Show.id).first().id,
+        }
+
+
+def count_queries(call):
+    queries = []
+
+    def record(*args):
+        queries.append(args[2])
+    event.listen(Engine, 'before_cursor_execute', record)
+    try:
+        call()
+    finally:
+        event.remove(Engine, 'before_cursor_execute', record)
+    return len(queries)
+
+
+@pytest.fixture
+def record(benchmark, request):
+    # Files a finished benchmark under name, then checks it against the baseline.
+    def run(name, queries):
+        benchmark.extra_info['queries'] = queries
+        stats = getattr(benchmark, 'stats', None)
+        median = stats.stats.median * 1000 if stats else None
+        results[name] = {'queries': queries, 'median_ms': round(median, 3) if median is not None else None}
+        if not request.config.getoption('update_baseline'):
+            check_baseline(name, results[name], request.config.getoption('latency_tolerance'))
+
+    return run
+
+
+@pytest.fixture
+def bench_route(app, busiest, benchmark, record):
+    client = app.test_client()
+
+    def run(name, method, url, data=None):
+        url = url.format(**busiest)
+        options = {'data': data}
+        if isinstance(data, list):
+            # A JSON body, whose strings may name the busiest venue and artist too.
+            options = {'json': [{key: value.format(**busiest) if isinstance(value, str) else value
+                                 for key, value in row.items()} for row in data]}
+
+        def call():
+            response = client.open(url, method=method, **options)
+            response.get_data()
+            assert response.status_code == 200, '%s %s: %s' % (method, url, response.status)
+
+        call()  # warm up: template compilation and lazily built indexes
+        queries = count_queries(call)
+        benchmark.group = 'routes'
+        benchmark(call)
+        record(name, queries)
+
+    return run
+
+
+def load_baseline():
+    if not os.path.exists(BASELINE):
+        return {}
+    with open(BASELINE) as f:
+        return json.load(f)
+
+
+def check_baseline(name, result, tolerance):
+    expected = load_baseline().get(name)
+    if expected is None:
+        return
+    if result['queries'] > expected['queries']:
+        pytest.fail('%s: %d queries, baseline %d' % (name, result['queries'], expected['queries']))
+    if result['median_ms'] is not None and expected.get('median_ms'):
+        limit = expected['median_ms'] * (1 + tolerance) + LATENCY_SLACK_MS
+        if result['median_ms'] > limit:
+            pytest.fail('%s: median %.2fms, baseline %.2fms (limit %.2fms)'
+                        % (name, result['median_ms'], expected['median_ms'], limit))
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if session.config.getoption('update_baseline') and results:
+        # A --benchmark-disable run has no latencies; it keeps the old ones.
+        baseline = load_baseline()
+        for name, result in results.items():
+            baseline.setdefault(name, {}).update((key, value) for key, value in result.items() if value is not None)
+        with open(BASELINE, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
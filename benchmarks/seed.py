@@ -0,0 +1,148 @@
+"""Fill an empty database with a generated, realistically skewed dataset.
+
+    python benchmarks/seed.py DATABASE_URL [--venues N] [--artists N] [--shows N] [--seed N]
+
+A few big cities hold most venues and artists, popularity is long-tailed (a
+handful of venues and touring artists carry most shows), shows start in the
+evening on the hour or half hour over the past and coming year, and each
+venue/artist has one to three genres. The same --seed always produces the
+same data, relative to the time it is seeded. Tables are created if missing;
+on PostgreSQL run `flask db upgrade` first to get the search indexes too.
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import timedelta
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CITIES = [
+    ('New York', 'NY', 30), ('Los Angeles', 'CA', 20), ('Chicago', 'IL', 10), ('San Francisco', 'CA', 8),
+    ('Austin', 'TX', 7), ('Nashville', 'TN', 7), ('Seattle', 'WA', 5), ('New Orleans', 'LA', 4),
+    ('Denver', 'CO', 3), ('Atlanta', 'GA', 3), ('Portland', 'OR', 2), ('Boston', 'MA', 1),
+]
+GENRES = [
+    ('Rock n Roll', 20), ('Pop', 15), ('Hip-Hop', 12), ('Jazz', 10), ('Electronic', 10), ('Alternative', 8),
+    ('Country', 7), ('R&B', 6), ('Folk', 5), ('Blues', 5), ('Punk', 4), ('Soul', 4), ('Heavy Metal', 4),
+    ('Reggae', 3), ('Classical', 3), ('Funk', 3), ('Instrumental', 2), ('Musical Theatre', 2), ('Other', 1),
+]
+WORDS = ['The', 'Blue', 'Electric', 'Velvet', 'Golden', 'Midnight', 'Silver', 'Red', 'Wild', 'Hollow',
+         'Crystal', 'Iron', 'Neon', 'Lucky', 'Royal', 'Black', 'Paper', 'Stone', 'Echo', 'Coyote']
+VENUE_KINDS = ['Hall', 'Lounge', 'Room', 'Club', 'Theatre', 'Bar', 'Ballroom', 'Garden', 'Tavern', 'Stage']
+DURATIONS = [(60, 2), (90, 3), (120, 4), (180, 1)]
+
+CHUNK_SIZE = 1000
+
+
+def weighted(rng, pairs):
+    values, weights = zip(*pairs)
+    return rng.choices(values, weights)[0]
+
+
+def entity_rows(rng, count, kind, now):
+    rows, genres = [], []
+    for number in range(count):
+        city, state, _ = rng.choices(CITIES, [weight for _, _, weight in CITIES])[0]
+        name = '%s %s' % (' '.join(rng.sample(WORDS, 2)), rng.choice(VENUE_KINDS) if kind == 'venue' else number)
+        row = {
+            'name': name, 'city': city, 'state': state, 'phone': '555-%03d-%04d' % (rng.randrange(1000), number),
+            'image_link': None, 'facebook_link': None, 'website': None, 'seeking_description': None,
+            'upcoming_shows_count': 0, 'next_show_time': None, 'updated_at': now,
+        }
+        if kind == 'venue':
+            row.update({'address': '%d %s St' % (rng.randrange(1, 2000), rng.choice(WORDS)),
+                        'seeking_talent': rng.random() < 0.3})
+        else:
+            row['seeking_venue'] = rng.random() < 0.4
+        rows.append(row)
+        genres.append(list({weighted(rng, GENRES) for _ in range(rng.randint(1, 3))}))
+    return rows, genres
+
+
+def show_rows(rng, count, venue_ids, artist_ids, now):
+    # Pareto weights give the long tail; cum_weights keep choices() O(log n).
+    venue_weights = list(accumulate(rng.paretovariate(1.5) for _ in venue_ids))
+    artist_weights = list(accumulate(rng.paretovariate(1.2) for _ in artist_ids))
+    rows = []
+    for _ in range(count):
+        day = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=rng.randint(-365, 365))
+        rows.append({
+            'venue_id': rng.choices(venue_ids, cum_weights=venue_weights)[0],
+            'artist_id': rng.choices(artist_ids, cum_weights=artist_weights)[0],
+            'start_time': day + timedelta(hours=rng.randint(18, 23), minutes=rng.choice((0, 30))),
+            'duration': weighted(rng, DURATIONS),
+            'updated_at': now,
+        })
+    return rows
+
+
+def insert(model, rows):
+    # Ids are reserved up front, as `flask import` does, then rows are written
+    # with COPY on PostgreSQL and executemany elsewhere.
+    from importer import IMPORTERS, write_rows
+    kind = {'Venue': 'venues', 'Artist': 'artists', 'Show': 'shows'}[model.__name__]
+    ids = IMPORTERS[kind].reserve_ids(len(rows))
+    for id, row in zip(ids, rows):
+        row['id'] = id
+    for start in range(0, len(rows), CHUNK_SIZE):
+        write_rows(model.__table__, rows[start:start + CHUNK_SIZE])
+    return ids
+
+
+def link_genres(model, ids, genres):
+    from importer import write_rows
+    from models import db, Genre, GENRE_LINKS
+    link = GENRE_LINKS[model]
+    found = Genre.lookup([name for names in genres for name in names])
+    db.session.flush()
+    genre_ids = {genre.name: genre.id for genre in found}
+    rows = [{link.name: id, 'genre_id': genre_ids[name]} for id, names in zip(ids, genres) for name in names]
+    for start in range(0, len(rows), CHUNK_SIZE):
+        write_rows(link.table, rows[start:start + CHUNK_SIZE])
+
+
+def seed(venues, artists, shows, seed=0):
+    # Runs inside an app context on an empty database.
+    from models import db, Venue, Artist, Show, refresh_show_counters, utc_now
+    if db.session.query(Venue.id).first() or db.session.query(Artist.id).first():
+        raise SystemExit('refusing to seed: the database already has venues or artists')
+    rng = random.Random(seed)
+    now = utc_now()
+
+    venue_rows, venue_genres = entity_rows(rng, venues, 'venue', now)
+    venue_ids = insert(Venue, venue_rows)
+    link_genres(Venue, venue_ids, venue_genres)
+    artist_rows, artist_genres = entity_rows(rng, artists, 'artist', now)
+    artist_ids = insert(Artist, artist_rows)
+    link_genres(Artist, artist_ids, artist_genres)
+    insert(Show, show_rows(rng, shows, venue_ids, artist_ids, now))
+
+    refresh_show_counters(Venue, Show.venue_id, Venue.id.isnot(None), now)
+    refresh_show_counters(Artist, Show.artist_id, Artist.id.isnot(None), now)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('database_url')
+    parser.add_argument('--venues', type=int, default=500)
+    parser.add_argument('--artists', type=int, default=2000)
+    parser.add_argument('--shows', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = os.environ['TEST_DATABASE_URL'] = args.database_url
+    os.environ.pop('DATABASE_REPLICA_URLS', None)
+    from app import create_app
+    from models import db
+    with create_app().app_context():
+        db.create_all()
+        seed(args.venues, args.artists, args.shows, args.seed)
+    print('seeded %d venues, %d artists and %d shows into %s'
+          % (args.venues, args.artists, args.shows, args.database_url))
+
+
+if __name__ == '__main__':
+    main()
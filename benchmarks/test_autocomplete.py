@@ -0,0 +1,45 @@
+"""p99 latency of a typeahead lookup, which has to stay under a millisecond
+without touching the database.
+
+Each prefix of each seeded venue and artist name is looked up once before
+the LRU holds it and once after, so the percentiles cover misses and hits.
+The lookups run back to back within INDEX_CHECK_SECONDS of loading the
+index, so none of them checks its stamp. This times the index and the LRU
+alone: the test client's own overhead is about as large as the target and
+swings with the machine, so whole requests are left to test_routes.py and
+its baseline medians.
+"""
+import time
+
+from conftest import count_queries
+
+P99_LIMIT_MS = 1.0
+
+
+def test_autocomplete_p99(app, request):
+    from autocomplete import completer
+    from models import Venue, Artist
+    timings = []
+
+    with app.app_context():
+        names = [('venue', name) for name, in Venue.query.with_entities(Venue.name)]
+        names += [('artist', name) for name, in Artist.query.with_entities(Artist.name)]
+        prefixes = sorted({(type, name[:length]) for type, name in names for length in range(1, len(name) + 1)})
+        limit = app.config['AUTOCOMPLETE_LIMIT']
+
+        def run():
+            for type, prefix in prefixes + prefixes:
+                started = time.perf_counter()
+                completer(type).lookup(prefix, limit)
+                timings.append(time.perf_counter() - started)
+
+        completer('venue').lookup('a', limit)  # loads both indexes
+        completer('artist').lookup('a', limit)
+        assert count_queries(run) == 0
+
+    timings.sort()
+    p99 = timings[int(len(timings) * 0.99)] * 1000
+    print('autocomplete: %d lookups, median %.3fms, p99 %.3fms'
+          % (len(timings), timings[len(timings) // 2] * 1000, p99))
+    if not request.config.getoption('benchmark_disable'):
+        assert p99 < P99_LIMIT_MS, 'p99 %.3fms, limit %.1fms' % (p99, P99_LIMIT_MS)
@@ -0,0 +1,53 @@
+"""Latency and query count of each read route of the app and its API.
+
+The create/edit/delete submissions are left out: they change the seeded data,
+so successive rounds would not measure the same request. The show batch is
+measured as a dry run, which checks the shows and books nothing.
+"""
+import pytest
+
+ROUTES = [
+    ('index', 'GET', '/', None),
+    ('venues', 'GET', '/venues', None),
+    ('venues_by_genre', 'GET', '/venues?genre=Jazz', None),
+    ('search_venues', 'POST', '/venues/search', {'search_term': 'blue'}),
+    ('show_venue', 'GET', '/venues/{venue_id}', None),
+    ('venue_shows_calendar', 'GET', '/venues/{venue_id}/shows.ics', None),
+    ('create_venue_form', 'GET', '/venues/create', None),
+    ('edit_venue', 'GET', '/venues/{venue_id}/edit', None),
+    ('artists', 'GET', '/artists', None),
+    ('artists_by_genre', 'GET', '/artists?genre=Jazz', None),
+    ('search_artists', 'POST', '/artists/search', {'search_term': 'blue'}),
+    ('show_artist', 'GET', '/artists/{artist_id}', None),
+    ('artist_shows_calendar', 'GET', '/artists/{artist_id}/shows.ics', None),
+    ('create_artist_form', 'GET', '/artists/create', None),
+    ('edit_artist', 'GET', '/artists/{artist_id}/edit', None),
+    ('shows', 'GET', '/shows', None),
+    ('shows_export', 'GET', '/shows.csv', None),
+    ('create_shows', 'GET', '/shows/create', None),
+    ('api_autocomplete_venue', 'GET', '/api/autocomplete?type=venue&q=blue', None),
+    ('api_autocomplete_artist', 'GET', '/api/autocomplete?type=artist&q=blue', None),
+    ('api_browse_venues', 'GET', '/api/browse/venues', None),
+    ('api_browse_venues_by_genre', 'GET', '/api/browse/venues?genre=Jazz&upcoming_within=30', None),
+    ('api_browse_artists', 'GET', '/api/browse/artists', None),
+    ('api_browse_shows', 'GET', '/api/browse/shows', None),
+    ('api_venues', 'GET', '/api/v1/venues', None),
+    ('api_venue', 'GET', '/api/v1/venues/{venue_id}', None),
+    ('api_artists', 'GET', '/api/v1/artists', None),
+    ('api_artist', 'GET', '/api/v1/artists/{artist_id}', None),
+    ('api_shows', 'GET', '/api/v1/shows', None),
+    ('api_show', 'GET', '/api/v1/shows/{show_id}', None),
+    ('api_shows_batch_dry_run', 'POST', '/api/v1/shows/batch?dry_run=1', [
+        {'venue_id': '{venue_id}', 'artist_id': '{artist_id}', 'start_time': start, 'duration': 120}
+        for start in ('2030-01-01 20:00:00', '2030-01-02 20:00:00', '2030-01-03 20:00:00')
+    ]),
+    ('api_cache_stats', 'GET', '/api/cache/stats', None),
+    ('api_pool_stats', 'GET', '/api/pool/stats', None),
+    ('api_profile_stats', 'GET', '/api/profile/stats', None),
+    ('api_log_stats', 'GET', '/api/log/stats', None),
+]
+
+
+@pytest.mark.parametrize('name, method, url, data', ROUTES, ids=[route[0] for route in ROUTES])
+def test_route(bench_route, name, method, url, data):
+    bench_route(name, method, url, data)
@@ -0,0 +1,42 @@
+"""Cold-start time of a worker: a fresh interpreter importing app and calling create_app().
+
+Each round is a new process, so nothing is cached in sys.modules; the time
+includes interpreter start-up, which is the same before and after any change.
+When it regresses, find the module responsible with
+
+    python -X importtime -c "from app import create_app; create_app('testing')" 2>&1 | sort -t'|' -k2 -n | tail
+
+The app imports dateutil, babel and alembic (through Flask-Migrate) on first
+use only; the test fails when dateutil or alembic is back on the start-up
+path. babel is not checked: Flask-WTF imports it for its translations.
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAZY_MODULES = ['dateutil.parser', 'alembic', 'flask_migrate']
+
+START = '''
+import json, sys
+from app import create_app
+create_app('testing')
+print(json.dumps([name for name in %r if name in sys.modules]))
+''' % LAZY_MODULES
+
+
+def start():
+    env = dict(os.environ, FYYUR_CONFIG='testing', TEST_DATABASE_URL='sqlite://')
+    env.pop('DATABASE_REPLICA_URLS', None)
+    output = subprocess.run([sys.executable, '-c', START], cwd=ROOT, env=env, check=True,
+                            stdout=subprocess.PIPE).stdout
+    return json.loads(output)
+
+
+def test_cold_start(benchmark, record):
+    assert start() == [], 'imported at start-up'
+    benchmark.group = 'startup'
+    benchmark.pedantic(start, rounds=10, iterations=1)
+    record('cold_start', 0)
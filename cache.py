@@ -0,0 +1,343 @@
+import hashlib
+import itertools
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, g, has_app_context, request, session
+from sqlalchemy import event, inspect, select
+from werkzeug.urls import url_encode
+
+from models import db, Venue, Artist, Show, Stamp, as_utc, utc_now
+from routing import RoutingSession
+
+
+# ----------------------------------------------------------------------------#
+# Backends.
+# ----------------------------------------------------------------------------#
+
+class NullCache(object):
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+
+class MemoryCache(object):
+    # Per-process TTL + LRU store.
+
+    def __init__(self, max_entries=2048, default_timeout=300):
+        self.max_entries = max_entries
+        self.default_timeout = default_timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        with self.lock:
+            expires = time.time() + (timeout or self.default_timeout)
+            self.entries[key] = (expires, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+class FileSystemCache(object):
+    # Shared between the workers of one host. Each key is a pickle file that is
+    # replaced atomically.
+
+    def __init__(self, directory, default_timeout=300):
+        self.directory = directory
+        self.default_timeout = default_timeout
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest())
+
+    def get(self, key):
+        try:
+            with open(self.path(key), 'rb') as f:
+                expires, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if expires < time.time():
+            self.delete(key)
+            return None
+        return value
+
+    def set(self, key, value, timeout=None):
+        expires = time.time() + (timeout or self.default_timeout)
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((expires, value), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+
+
+# ----------------------------------------------------------------------------#
+# Tagged page cache.
+# ----------------------------------------------------------------------------#
+#
+# Every cached page records the version of each tag it depends on ('venues',
+# 'venue:3', ...). The versions are rows of the Stamp table, so every worker
+# and every CLI command sees the same ones. A write bumps the tags it affects
+# in its own transaction, and a page whose recorded versions no longer match
+# is rendered again. Only the rendered bodies are kept in the backend, per
+# process or per host. Checking a hit is one primary-key lookup, which the
+# conditional GET validators of the same request share.
+
+class Cache(object):
+    # The backend and the hit/miss counters belong to the app, in
+    # app.extensions['cache'], so apps created side by side (tests, the CLI)
+    # each keep their own.
+
+    def init_app(self, app):
+        cache_type = app.config['CACHE_TYPE']
+        timeout = app.config['CACHE_DEFAULT_TIMEOUT']
+        if cache_type == 'memory':
+            backend = MemoryCache(app.config['CACHE_MAX_ENTRIES'], timeout)
+        elif cache_type == 'filesystem':
+            backend = FileSystemCache(app.config['CACHE_DIR'], timeout)
+        elif cache_type == 'null':
+            backend = NullCache()
+        else:
+            raise ValueError('Unknown CACHE_TYPE: %r' % cache_type)
+        app.extensions['cache'] = {
+            'backend': backend,
+            'default_timeout': timeout,
+            'stats': {'hits': 0, 'misses': 0, 'invalidations': 0},
+        }
+        app.before_request(self.forget_versions)
+
+    @property
+    def backend(self):
+        return current_app.extensions['cache']['backend']
+
+    @property
+    def default_timeout(self):
+        return current_app.extensions['cache']['default_timeout']
+
+    @property
+    def stats(self):
+        return current_app.extensions['cache']['stats']
+
+    def forget_versions(self):
+        # The app context, and with it g, can outlive a request, such as under
+        # the test client.
+        g.pop('stamps', None)
+
+    def versions(self, tags):
+        # {tag: (version, updated_at)}, with (0, None) for a tag that was never
+        # bumped. Read at most once per tag per request.
+        return self.versions_with(tags)[0]
+
+    def versions_with(self, tags, *columns):
+        # versions(tags), and the values of the scalar subqueries in columns,
+        # read in the same round trip.
+        known = g.setdefault('stamps', {})
+        missing = [tag for tag in tags if tag not in known]
+        values = []
+        if missing or columns:
+            stamps = [db.session.query(column).filter(Stamp.name == tag).as_scalar()
+                      for tag in missing for column in (Stamp.version, Stamp.updated_at)]
+            row = db.session.query(*stamps + list(columns)).one()
+            for position, tag in enumerate(missing):
+                version, updated_at = row[2 * position:2 * position + 2]
+                known[tag] = (version or 0, updated_at and as_utc(updated_at))
+            values = list(row[len(stamps):])
+        return {tag: known[tag] for tag in tags}, values
+
+    def get(self, key):
+        entry = self.backend.get(key)
+        if entry is not None:
+            value, versions = entry
+            current = self.versions(versions)
+            if all(current[tag][0] == version for tag, version in versions.items()):
+                self.stats['hits'] += 1
+                return value
+            self.backend.delete(key)
+        self.stats['misses'] += 1
+        return None
+
+    def set(self, key, value, versions, timeout=None):
+        self.backend.set(key, (value, {tag: version for tag, (version, updated_at) in versions.items()}), timeout)
+
+    def invalidate(self, *tags):
+        # The tags are bumped when the current transaction commits, together
+        # with the writes they cover; a rollback drops them.
+        stale_tags(db.session).update(tags)
+
+    def page(self, tags, expires=None):
+        # Caches the rendered body of a GET view. tags(**view_args) names what
+        # the page depends on; expires(**view_args), if given, is when the
+        # page changes by itself (None for not before the cache timeout).
+        # Requests carrying flashed messages bypass the cache because the page
+        # shows (and consumes) them.
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                if request.method != 'GET' or '_flashes' in session or isinstance(self.backend, NullCache):
+                    return view(**kwargs)
+                key = 'page:' + request.path + '?' + url_encode(request.args, sort=True)
+                body = self.get(key)
+                if body is None:
+                    # Versions are read before rendering, so a write that
+                    # commits meanwhile makes the stored page stale at once.
+                    versions = self.versions(tags(**kwargs))
+                    body = view(**kwargs)
+                    timeout = self.default_timeout
+                    until = expires(**kwargs) if expires else None
+                    if until is not None:
+                        timeout = min(timeout, (until - utc_now()).total_seconds())
+                    if isinstance(body, str) and timeout > 0:
+                        self.set(key, body, versions, timeout)
+                return body
+            return wrapper
+        return decorator
+
+
+cache = Cache()
+
+
+def stale_tags(db_session):
+    return db_session.info.setdefault('stale_tags', set())
+
+
+# Bumped by every write to the rows behind the in-process search and
+# typeahead indexes (see Watched).
+INDEX_TAGS = {
+    Venue: 'index:venues',
+    Artist: 'index:artists',
+}
+
+
+def written_tags(db_session, instance):
+    # The tags a write of instance makes stale: those of the pages that show
+    # it, and of the index built from its rows.
+    if isinstance(instance, Show):
+        # A show moved to another venue or artist leaves the old pages too.
+        state = inspect(instance)
+        venue_ids = set(state.attrs.venue_id.history.sum()) | {instance.venue_id}
+        artist_ids = set(state.attrs.artist_id.history.sum()) | {instance.artist_id}
+        return (['shows', 'venues'] + ['venue:%d' % id for id in venue_ids if id is not None]
+                + ['artist:%d' % id for id in artist_ids if id is not None])
+    if isinstance(instance, Venue):
+        # Artist pages list the venues they play at, so they go too.
+        artist_ids = db_session.query(Show.artist_id).filter(Show.venue_id == instance.id).distinct()
+        return (['venues', 'shows', 'venue:%d' % instance.id, INDEX_TAGS[Venue]]
+                + ['artist:%d' % id for id, in artist_ids])
+    if isinstance(instance, Artist):
+        venue_ids = db_session.query(Show.venue_id).filter(Show.artist_id == instance.id).distinct()
+        return (['artists', 'shows', 'artist:%d' % instance.id, INDEX_TAGS[Artist]]
+                + ['venue:%d' % id for id, in venue_ids])
+    return []
+
+
+def bump(db_session, tags):
+    # Gives every tag a new version. Tags are taken in sorted order, so two
+    # transactions bumping the same tags cannot deadlock on each other.
+    now = utc_now()
+    table = Stamp.__table__
+    tags = sorted(tags)
+    if db_session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table).values([{'name': tag, 'version': 1, 'updated_at': now} for tag in tags])
+        db_session.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.name],
+            set_={'version': table.c.version + 1, 'updated_at': statement.excluded.updated_at}))
+    else:
+        # The UPDATE takes SQLite's write lock, so no other transaction can
+        # insert one of these tags before this one commits.
+        db_session.execute(table.update().where(table.c.name.in_(tags)).values(
+            version=table.c.version + 1, updated_at=now))
+        known = {name for name, in db_session.execute(select([table.c.name]).where(table.c.name.in_(tags)))}
+        missing = [tag for tag in tags if tag not in known]
+        if missing:
+            db_session.execute(table.insert(), [{'name': tag, 'version': 1, 'updated_at': now} for tag in missing])
+    if has_app_context():
+        cache.forget_versions()
+        cache.stats['invalidations'] += len(tags)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def collect_stale_tags(db_session, flush_context):
+    # new, dirty and deleted still hold what this flush wrote.
+    tags = stale_tags(db_session)
+    for instance in itertools.chain(db_session.new, db_session.dirty, db_session.deleted):
+        tags.update(written_tags(db_session, instance))
+
+
+@event.listens_for(RoutingSession, 'before_commit')
+def bump_stale_tags(db_session):
+    db_session.flush()
+    tags = db_session.info.pop('stale_tags', None)
+    if tags:
+        bump(db_session, tags)
+
+
+@event.listens_for(RoutingSession, 'after_soft_rollback')
+def drop_stale_tags(db_session, previous_transaction):
+    db_session.info.pop('stale_tags', None)
+
+
+# ----------------------------------------------------------------------------#
+# In-process indexes.
+# ----------------------------------------------------------------------------#
+
+class Watched(object):
+    # Something a process builds from the rows behind a Stamp tag, such as a
+    # search index. get() builds it again once the tag has been bumped by any
+    # process, looking at the tag at most every interval seconds: other
+    # workers' writes show up within that long, and the rest of the time a
+    # lookup costs no query.
+
+    def __init__(self, tag, build, interval):
+        self.tag = tag
+        self.build = build
+        self.interval = interval
+        self.value = None
+        self.version = None
+        self.checked = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.value is None or now - self.checked >= self.interval:
+                # Read before building, so a write committed meanwhile is
+                # picked up by the next check rather than lost.
+                version = db.session.query(Stamp.version).filter(Stamp.name == self.tag).scalar() or 0
+                self.checked = now
+                if self.value is None or version != self.version:
+                    self.value = self.build()
+                    self.version = version
+            return self.value
@@ -0,0 +1,91 @@
+import hashlib
+from functools import wraps
+
+from flask import make_response, request, session
+from sqlalchemy import func
+
+from cache import cache
+from models import db, Show, as_utc, utc_now
+
+
+# ----------------------------------------------------------------------------#
+# Conditional GET.
+# ----------------------------------------------------------------------------#
+#
+# Validators come from the Stamp versions of the page cache tags a page
+# depends on (see cache.py), which every write bumps, so a revalidation is one
+# primary-key lookup and no rendering, however big the tables are. The same
+# versions decide whether the cached body is current, and are only read once
+# per request. A detail page also changes when one of its shows starts, so
+# its validators include when the latest one started and when the next one
+# starts, both from the (entity_id, start_time) index.
+
+def validators(tags, *columns):
+    # columns are scalar subqueries of moments the page changed at (if in the
+    # past) or will change at (if in the future).
+    versions, moments = cache.versions_with(tags, *columns)
+    moments = [moment and as_utc(moment) for moment in moments]
+    now = utc_now()
+    modified = [updated_at for version, updated_at in versions.values() if updated_at]
+    modified += [moment for moment in moments if moment and moment <= now]
+    # Pages of the same listing share tags but not content.
+    stamps = sorted((tag, version) for tag, (version, updated_at) in versions.items())
+    etag = hashlib.sha1(repr((request.full_path, stamps, moments)).encode()).hexdigest()
+    return etag, max(modified) if modified else None
+
+
+def show_moments(foreign_key, entity_id):
+    # When the entity's latest show started and when its next one starts.
+    now = utc_now()
+    latest = db.session.query(func.max(Show.start_time)).filter(foreign_key == entity_id, Show.start_time <= now)
+    upcoming = db.session.query(func.min(Show.start_time)).filter(foreign_key == entity_id, Show.start_time > now)
+    return [latest.as_scalar(), upcoming.as_scalar()]
+
+
+def venues_validators():
+    # The directory shows the maintained counters; show writes and
+    # sweep-shows bump 'venues' as they change them.
+    return validators(['venues'])
+
+
+def artists_validators():
+    return validators(['artists'])
+
+
+def shows_validators():
+    return validators(['shows'])
+
+
+def venue_validators(venue_id):
+    return validators(['venue:%d' % venue_id], *show_moments(Show.venue_id, venue_id))
+
+
+def artist_validators(artist_id):
+    return validators(['artist:%d' % artist_id], *show_moments(Show.artist_id, artist_id))
+
+
+def conditional(compute_validators):
+    # Answers 304 Not Modified when the client's weak ETag (or, without one,
+    # its If-Modified-Since) still matches, before the view or the page cache
+    # run at all.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            if request.method != 'GET' or '_flashes' in session:
+                return view(**kwargs)
+            etag, last_modified = compute_validators(**kwargs)
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = bool(last_modified and request.if_modified_since and
+                                    last_modified.replace(microsecond=0) <= as_utc(request.if_modified_since))
+            if not_modified:
+                response = make_response('', 304)
+            else:
+                response = make_response(view(**kwargs))
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,79 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import or_
+
+from cache import cache
+from models import db, Venue, Artist, Show, as_utc, refresh_show_counters, upcoming_show_counters, utc_now
+
+
+# ----------------------------------------------------------------------------#
+# Upcoming show counters.
+# ----------------------------------------------------------------------------#
+
+COUNTED = (
+    (Venue, Show.venue_id, 'venues'),
+    (Artist, Show.artist_id, 'artists'),
+)
+
+
+def sweep(now=None):
+    # Shows that have started since the last sweep only affect rows whose
+    # next_show_time has passed, which the next_show_time index finds directly.
+    if now is None:
+        now = utc_now()
+    swept = {}
+    for model, foreign_key, tag in COUNTED:
+        swept[tag] = refresh_show_counters(model, foreign_key, model.next_show_time <= now, now)
+    # Bumped in the same transaction, so every worker's cached listing goes.
+    cache.invalidate(*[tag for tag, count in swept.items() if count])
+    db.session.commit()
+    return swept
+
+
+def drift(now=None):
+    # Rows whose stored counters differ from a from-scratch recount.
+    if now is None:
+        now = utc_now()
+    drifted = {}
+    for model, foreign_key, tag in COUNTED:
+        count, next_show_time = upcoming_show_counters(foreign_key, model.id, now)
+        rows = db.session.query(
+            model.id, model.upcoming_shows_count, count, model.next_show_time, next_show_time
+        ).filter(or_(
+            model.upcoming_shows_count != count,
+            model.next_show_time != next_show_time,
+            model.next_show_time.is_(None) != next_show_time.is_(None)
+        ))
+        drifted[tag] = [row for row in rows
+                        if row[1] != row[2] or (row[3] and as_utc(row[3])) != (row[4] and as_utc(row[4]))]
+    return drifted
+
+
+@click.command('sweep-shows')
+@with_appcontext
+def sweep_shows():
+    """Roll upcoming show counters forward for shows that have started."""
+    for tag, count in sweep().items():
+        click.echo('%s: %d refreshed' % (tag, count))
+
+
+@click.command('check-counters')
+@click.option('--fix', is_flag=True, help='Rewrite the counters that drifted.')
+@with_appcontext
+def check_counters(fix):
+    """Recount upcoming shows from scratch and report drift."""
+    now = utc_now()
+    drifted = drift(now)
+    for model, foreign_key, tag in COUNTED:
+        for id, stored, actual, stored_next, actual_next in drifted[tag]:
+            click.echo('%s %d: upcoming_shows_count %d != %d, next_show_time %s != %s'
+                       % (tag, id, stored, actual, stored_next, actual_next))
+        if fix and drifted[tag]:
+            refresh_show_counters(model, foreign_key, model.id.in_([row[0] for row in drifted[tag]]), now)
+    if fix:
+        cache.invalidate(*[tag for tag, rows in drifted.items() if rows])
+        db.session.commit()
+    total = sum(len(rows) for rows in drifted.values())
+    click.echo('%d rows drifted%s' % (total, ', fixed' if fix and total else ''))
+    if total and not fix:
+        raise SystemExit(1)
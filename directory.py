@@ -0,0 +1,46 @@
+from models import db, Venue, filter_by_genre
+from pagination import non_null, request_page
+
+
+# ----------------------------------------------------------------------------#
+# Venue directory.
+# ----------------------------------------------------------------------------#
+
+def directory_query(genre=None):
+    # num_upcoming_shows is the counter maintained on the Venue row, so the
+    # directory is a plain index scan with no join against Show. A venue with
+    # no city or state is listed (and paged) under ''.
+    query = db.session.query(
+        Venue.id, Venue.name, non_null(Venue.city), non_null(Venue.state),
+        Venue.upcoming_shows_count.label('num_upcoming_shows')
+    )
+    if genre:
+        query = filter_by_genre(query, Venue, genre)
+    return query
+
+
+def group_by_area(rows):
+    # rows must be ordered by state and city, so every area is contiguous.
+    areas = []
+    for row in rows:
+        if not areas or (areas[-1]['city'], areas[-1]['state']) != (row.city, row.state):
+            areas.append({
+                'city': row.city,
+                'state': row.state,
+                'venues': []
+            })
+        areas[-1]['venues'].append({
+            'id': row.id,
+            'name': row.name,
+            'num_upcoming_shows': row.num_upcoming_shows
+        })
+    return areas
+
+
+DIRECTORY_ORDER = (non_null(Venue.state), non_null(Venue.city), Venue.id)
+
+
+def venue_directory(genre=None):
+    # One page of the directory, keyset-paginated on (state, city, id).
+    page = request_page(directory_query(genre), DIRECTORY_ORDER)
+    return group_by_area(page.items), page
@@ -6,13 +6,22 @@ from fabric.contrib.console import confirm
 
 def test():
     with settings(warn_only=True):
-        result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
-        )
+        result = local("python -m pytest benchmarks --benchmark-disable", capture=True)
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
 
+def templates():
+    # Stops on a template that does not parse. The bytecode cache it writes
+    # stays on this machine (.cache/ is not committed): on Heroku each dyno
+    # compiles the templates once at start-up, with TEMPLATE_PRELOAD.
+    local("FLASK_APP=app flask compile-templates")
+
+
+def assets():
+    local("FLASK_APP=app flask assets")
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
@@ -24,6 +33,8 @@ def push():
 
 def prepare():
     test()
+    templates()
+    assets()
     commit()
     push()
 
@@ -39,14 +50,14 @@ def heroku():
 
 
 def heroku_test():
-    local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
-    )
+    local("heroku run python -m pytest benchmarks --benchmark-disable")
 
 
 def deploy():
     pull()
     test()
+    templates()
+    assets()
     commit()
     heroku()
     heroku_test()
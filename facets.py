@@ -0,0 +1,134 @@
+from datetime import timedelta
+
+from sqlalchemy import and_, case, func
+
+from models import db, Venue, Artist, Show, Genre, GENRE_LINKS, filter_by_genre, utc_now
+
+
+# ----------------------------------------------------------------------------#
+# Faceted browse.
+# ----------------------------------------------------------------------------#
+#
+# A selection ({'state': 'CA', 'genre': 'Jazz', 'upcoming_within': 30}) is
+# turned into one filtered query. Each facet's counts come from a GROUP BY over
+# that query with the facet's own selection left out, so picking a state still
+# shows how many matches every other state has.
+
+BOOLEAN_VALUES = {'true': True, '1': True, 'false': False, '0': False}
+
+
+class Browse(object):
+
+    def __init__(self, model, facets, genre_model, window):
+        self.model = model
+        self.facets = facets
+        self.genre_model = genre_model
+        self.window = window
+
+    def base_query(self):
+        # select_from keeps the model in FROM once with_entities() has swapped
+        # its columns for window sums, which only name it inside EXISTS.
+        return db.session.query(self.model).select_from(self.model)
+
+    def parse_selection(self, args):
+        # Returns (selection, error). Unknown arguments are ignored.
+        selection = {}
+        for name, column in self.facets.items():
+            value = args.get(name)
+            if not value:
+                continue
+            if column.type.python_type is bool:
+                if value.lower() not in BOOLEAN_VALUES:
+                    return None, '%s must be true or false' % name
+                value = BOOLEAN_VALUES[value.lower()]
+            selection[name] = value
+        if args.get('genre'):
+            selection['genre'] = args['genre']
+        if args.get('upcoming_within'):
+            try:
+                selection['upcoming_within'] = int(args['upcoming_within'])
+            except ValueError:
+                return None, 'upcoming_within must be a number of days'
+            if selection['upcoming_within'] < 0:
+                return None, 'upcoming_within must be a number of days'
+        return selection, None
+
+    def query(self, selection, now, skip=None):
+        query = self.base_query()
+        for name, column in self.facets.items():
+            if name != skip and name in selection:
+                query = query.filter(column == selection[name])
+        if skip != 'genre' and 'genre' in selection:
+            query = filter_by_genre(query, self.genre_model, selection['genre'])
+        if skip != 'upcoming_within' and 'upcoming_within' in selection:
+            query = query.filter(self.window(now, now + timedelta(days=selection['upcoming_within'])))
+        return query
+
+    def counts(self, query, column):
+        count = func.count(self.model.id)
+        rows = query.with_entities(column, count).group_by(column).order_by(count.desc(), column)
+        return [{'value': value, 'count': total} for value, total in rows if value is not None]
+
+    def facet_counts(self, selection, now, windows):
+        facets = {}
+        for name, column in self.facets.items():
+            facets[name] = self.counts(self.query(selection, now, skip=name), column)
+
+        link = GENRE_LINKS[self.genre_model]
+        genre_query = self.query(selection, now, skip='genre').join(
+            link.table, link == self.genre_model.id
+        ).join(Genre, Genre.id == link.table.c.genre_id)
+        facets['genre'] = self.counts(genre_query, Genre.name)
+
+        # Every window in one pass: SUM(CASE WHEN <has a show in window>).
+        window_query = self.query(selection, now, skip='upcoming_within')
+        sums = [func.coalesce(func.sum(case([(self.window(now, now + timedelta(days=days)), 1)], else_=0)), 0)
+                for days in windows]
+        totals = window_query.with_entities(*sums).one() if windows else []
+        facets['upcoming_within'] = [{'value': days, 'count': total} for days, total in zip(windows, totals)]
+        return facets
+
+
+def has_show_between(show_key, entity_id):
+    def window(start, end):
+        return db.session.query(Show.id).filter(
+            show_key == entity_id, Show.start_time > start, Show.start_time <= end
+        ).exists()
+    return window
+
+
+class ShowBrowse(Browse):
+    # Shows are browsed by their venue's location and their artist's genres.
+
+    def base_query(self):
+        return db.session.query(Show).join(Show.Venue).join(Show.Artist)
+
+
+BROWSE = {
+    'venues': Browse(
+        Venue,
+        {'state': Venue.state, 'city': Venue.city, 'seeking_talent': Venue.seeking_talent},
+        Venue,
+        has_show_between(Show.venue_id, Venue.id),
+    ),
+    'artists': Browse(
+        Artist,
+        {'state': Artist.state, 'city': Artist.city, 'seeking_venue': Artist.seeking_venue},
+        Artist,
+        has_show_between(Show.artist_id, Artist.id),
+    ),
+    'shows': ShowBrowse(
+        Show,
+        {'state': Venue.state, 'city': Venue.city},
+        Artist,
+        lambda start, end: and_(Show.start_time > start, Show.start_time <= end),
+    ),
+}
+
+
+def browse(kind, selection, windows, now=None):
+    # The filtered query (for the caller to paginate) and the facet counts.
+    if now is None:
+        now = utc_now()
+    spec = BROWSE[kind]
+    return spec.query(selection, now), spec.facet_counts(selection, now, windows)
@@ -0,0 +1,128 @@
+import csv
+import io
+
+from flask import Response, abort, current_app, request, stream_with_context, url_for
+
+from models import db, Venue, Artist, Show, as_utc
+
+
+# ----------------------------------------------------------------------------#
+# Show feeds.
+# ----------------------------------------------------------------------------#
+#
+# Feeds are written row by row from a server-side cursor over Show joined with
+# its venue and artist, so a feed of any size is never held in memory.
+
+def feed_window():
+    # ?from= / ?to= (dates or timestamps) bound the feed by start time.
+    try:
+        start = request.args.get('from') and as_utc(request.args['from'])
+        end = request.args.get('to') and as_utc(request.args['to'])
+    except (ValueError, OverflowError):
+        abort(400)
+    window = []
+    if start:
+        window.append(Show.start_time >= start)
+    if end:
+        window.append(Show.start_time < end)
+    return window
+
+
+def feed_rows(*criteria):
+    query = db.session.query(Show, Venue, Artist).join(Show.Venue).join(Show.Artist).filter(
+        *(list(criteria) + feed_window())
+    ).order_by(Show.start_time, Show.id)
+    return query.yield_per(current_app.config['FEED_BATCH_SIZE'])
+
+
+def stream(lines, mimetype, filename):
+    response = Response(stream_with_context(lines), mimetype=mimetype)
+    response.headers['Content-Disposition'] = 'inline; filename="%s"' % filename
+    return response
+
+
+#  CSV
+#  ----------------------------------------------------------------
+
+CSV_COLUMNS = ['id', 'start_time', 'duration', 'venue_id', 'venue_name', 'city', 'state', 'artist_id', 'artist_name']
+
+
+def csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values):
+        writer.writerow(values)
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    yield line(CSV_COLUMNS)
+    for show, venue, artist in rows:
+        yield line([show.id, show.start_time_utc.isoformat(), show.duration, venue.id, venue.name, venue.city, venue.state,
+                    artist.id, artist.name])
+
+
+def shows_csv():
+    return stream(csv_lines(feed_rows()), 'text/csv', 'shows.csv')
+
+
+#  iCalendar
+#  ----------------------------------------------------------------
+
+def ics_text(value):
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def ics_time(value):
+    return as_utc(value).strftime('%Y%m%dT%H%M%SZ')
+
+
+def ics_line(line):
+    # RFC 5545 folds content lines at 75 octets with CRLF + space.
+    data = line.encode('utf-8')
+    folded = []
+    while len(data) > 75:
+        cut = 75 if not folded else 74
+        while cut and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        folded.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+    folded.append(data.decode('utf-8'))
+    return '\r\n '.join(folded) + '\r\n'
+
+
+def ics_lines(rows, name):
+    host = request.host
+    yield ics_line('BEGIN:VCALENDAR')
+    yield ics_line('VERSION:2.0')
+    yield ics_line('PRODID:-//Fyyur//Shows//EN')
+    yield ics_line('X-WR-CALNAME:' + ics_text(name))
+    for show, venue, artist in rows:
+        location = ', '.join(part for part in (venue.name, venue.address, venue.city, venue.state) if part)
+        yield ''.join([
+            ics_line('BEGIN:VEVENT'),
+            ics_line('UID:show-%d@%s' % (show.id, host)),
+            # DTSTAMP follows the row, not the clock, so the ETag stays honest.
+            ics_line('DTSTAMP:' + ics_time(show.updated_at)),
+            ics_line('DTSTART:' + ics_time(show.start_time)),
+            ics_line('DURATION:PT%dM' % show.duration),
+            ics_line('SUMMARY:' + ics_text('%s at %s' % (artist.name, venue.name))),
+            ics_line('LOCATION:' + ics_text(location)),
+            ics_line('URL:' + url_for('venues.show_venue', venue_id=venue.id, _external=True)),
+            ics_line('END:VEVENT'),
+        ])
+    yield ics_line('END:VCALENDAR')
+
+
+def venue_calendar(venue_id):
+    venue = Venue.query.get_or_404(venue_id)
+    return stream(ics_lines(feed_rows(Show.venue_id == venue_id), venue.name),
+                  'text/calendar', 'venue-%d.ics' % venue_id)
+
+
+def artist_calendar(artist_id):
+    artist = Artist.query.get_or_404(artist_id)
+    return stream(ics_lines(feed_rows(Show.artist_id == artist_id), artist.name),
+                  'text/calendar', 'artist-%d.ics' % artist_id)
@@ -0,0 +1,58 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+
+
+# ----------------------------------------------------------------------------#
+# Datetime formatting.
+# ----------------------------------------------------------------------------#
+
+PATTERNS = {
+    'full': "d, y H:m",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+def in_utc(value):
+    # Times print in UTC, as babel.dates.format_datetime prints them; an
+    # aware value from PostgreSQL is in the session's TimeZone otherwise.
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+class DatetimeFormatter(object):
+    # Resolves the locale and compiles each named pattern once, then memoizes
+    # formatted strings: a listing renders the same few start times over and
+    # over, and babel would otherwise redo the locale lookup for every tile.
+    # babel itself is imported on the first call, not at worker start.
+
+    def __init__(self, locale=None, cache_size=4096):
+        self.locale_name = locale
+        self.locale = None
+        self.patterns = {}
+        self.format = lru_cache(maxsize=cache_size)(self.format_uncached)
+
+    def pattern(self, format):
+        pattern = self.patterns.get(format)
+        if pattern is None:
+            from babel.dates import parse_pattern
+            pattern = self.patterns[format] = parse_pattern(PATTERNS.get(format, format))
+        return pattern
+
+    def format_uncached(self, value, format='full'):
+        if not isinstance(value, datetime):
+            # Only legacy string values still need parsing.
+            import dateutil.parser
+            value = in_utc(dateutil.parser.parse(value))
+        if self.locale is None:
+            from babel import Locale
+            from babel.dates import LC_TIME
+            self.locale = Locale.parse(self.locale_name or LC_TIME)
+        return self.pattern(format).apply(value, self.locale)
+
+    def __call__(self, value, format='full'):
+        # Normalised before the cache lookup too: equal instants at different
+        # offsets are one key to lru_cache, but print differently.
+        if isinstance(value, datetime):
+            value = in_utc(value)
+        return self.format(value, format)
@@ -1,7 +1,7 @@
 from datetime import datetime
 from flask_wtf import FlaskForm
 from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, IntegerField
-from wtforms.validators import DataRequired, AnyOf, URL, Length
+from wtforms.validators import DataRequired, AnyOf, URL, Length, NumberRange, Optional
 
 state_choices = [
             ('AL', 'AL'),
@@ -79,6 +79,11 @@ genres_choices = [
         ]
 
 
+# Longest show, in minutes, that can be booked. Double-booking checks only look
+# this far back for shows still running at a new show's start.
+SHOW_MAX_DURATION = 24 * 60
+
+
 class ShowForm(FlaskForm):
     artist_id = IntegerField(
         'artist_id'
@@ -91,6 +96,10 @@ class ShowForm(FlaskForm):
         validators=[DataRequired()],
         default=datetime.now()
     )
+    duration = IntegerField(
+        'duration',
+        validators=[Optional(), NumberRange(min=1, max=SHOW_MAX_DURATION)]
+    )
 
 
 class VenueForm(FlaskForm):
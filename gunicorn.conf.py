@@ -0,0 +1,57 @@
+import multiprocessing
+import os
+
+# ----------------------------------------------------------------------------#
+# Gunicorn.
+# ----------------------------------------------------------------------------#
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# GUNICORN_PROFILE picks the worker model:
+#   gthread  (default) processes with a thread pool each; suits this app's mix
+#            of short DB queries and template rendering
+#   gevent   cooperative workers for many slow or idle clients (streamed feeds,
+#            exports); needs `pip install gevent psycogreen`
+#   sync     one request per process at a time
+# WEB_CONCURRENCY, GUNICORN_THREADS and GUNICORN_CONNECTIONS size them. Each
+# process has its own connection pool (DB_POOL_SIZE + DB_MAX_OVERFLOW in
+# config.py): with gthread keep the pool at least as large as the threads, with
+# gevent as large as the greenlets that can be in a query at once.
+
+profile = os.environ.get('GUNICORN_PROFILE', 'gthread')
+
+if profile == 'gevent':
+    # Patched before the app is preloaded, so its locks, sockets and psycopg2
+    # waits all go through gevent.
+    from gevent import monkey
+    monkey.patch_all()
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+
+bind = '0.0.0.0:%s' % os.environ.get('PORT', '8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+if profile == 'gthread':
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+elif profile == 'gevent':
+    worker_class = 'gevent'
+    worker_connections = int(os.environ.get('GUNICORN_CONNECTIONS', 100))
+else:
+    worker_class = 'sync'
+
+# Load the app once in the master and fork it, so workers share its memory and
+# a broken deploy fails before any worker starts.
+preload_app = True
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then, staggered, to bound slow leaks.
+max_requests = 2000
+max_requests_jitter = 200
+accesslog = '-'
+
+
+def post_fork(server, worker):
+    from wsgi import app
+    from models import dispose_engines
+    dispose_engines(app)
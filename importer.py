@@ -0,0 +1,273 @@
+import csv
+import io
+import json
+import os
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import false, func
+from werkzeug.datastructures import MultiDict
+
+from cache import INDEX_TAGS, cache
+from forms import VenueForm, ArtistForm, ShowForm
+from models import db, Venue, Artist, Show, Genre, GENRE_LINKS, as_utc, refresh_show_counters, utc_now
+
+
+# ----------------------------------------------------------------------------#
+# Bulk import.
+# ----------------------------------------------------------------------------#
+#
+# Rows are read one at a time, validated with the same WTForms rules as the
+# create forms and written chunk_size at a time: COPY on PostgreSQL, one
+# executemany INSERT elsewhere. Primary keys are reserved up front so genre
+# links can be written in the same chunk without reading ids back.
+
+def read_rows(path, format=None):
+    if format is None:
+        format = 'jsonl' if os.path.splitext(path)[1].lower() in ('.jsonl', '.json') else 'csv'
+    with open(path, newline='') as f:
+        if format == 'csv':
+            for line, row in enumerate(csv.DictReader(f), start=2):
+                yield line, row
+        else:
+            for line, text in enumerate(f, start=1):
+                if text.strip():
+                    try:
+                        yield line, json.loads(text)
+                    except ValueError:
+                        # Rejected by validate(), with the text as it was.
+                        yield line, text.rstrip('\r\n')
+
+
+def split_genres(value):
+    if isinstance(value, list):
+        return value
+    value = (value or '').strip().strip('{}[]')
+    return [name.strip().strip('"\'') for name in value.replace(';', ',').split(',') if name.strip()]
+
+
+def chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Importer(object):
+
+    def __init__(self, model, form_class, fields, has_genres, tags):
+        self.model = model
+        self.form_class = form_class
+        self.fields = fields
+        self.has_genres = has_genres
+        # The cache tags new rows make stale: the model's listing and index.
+        self.tags = tags
+
+    def formdata(self, row):
+        data = MultiDict()
+        for field in self.fields:
+            value = row.get(field)
+            if value is True:
+                # As a checked box posts it; str(False) would read as checked.
+                data[field] = 'y'
+            elif value is not None and value is not False:
+                data[field] = str(value)
+        if self.has_genres:
+            data.setlist('genres', split_genres(row.get('genres')))
+        return data
+
+    def validate(self, row):
+        # Returns (values, errors) for one input row.
+        if not isinstance(row, dict):
+            return None, {'row': ['Not a JSON object.']}
+        form = self.form_class(formdata=self.formdata(row), meta={'csrf': False})
+        if not form.validate():
+            return None, form.errors
+        values = {field: form[field].data for field in self.fields}
+        if self.has_genres:
+            values['genres'] = form.genres.data
+        return values, None
+
+    def check(self, rows, lock=False):
+        # Chunk-level checks that need the database; returns {position: errors}.
+        return {}
+
+    def reserve_ids(self, count):
+        table = self.model.__table__
+        if db.session.get_bind().dialect.name == 'postgresql':
+            sequence = '"%s_id_seq"' % table.name
+            return [id for id, in db.session.execute(
+                'SELECT nextval(\'%s\') FROM generate_series(1, :count)' % sequence, {'count': count})]
+        # SQLite serialises writers, so max(id) cannot move under this transaction.
+        start = (db.session.query(func.max(self.model.id)).scalar() or 0) + 1
+        return list(range(start, start + count))
+
+    def row_values(self, id, values, now):
+        row = {field: values[field] for field in self.fields}
+        row.update({'id': id, 'updated_at': now})
+        return row
+
+    def insert(self, rows):
+        now = utc_now()
+        ids = self.reserve_ids(len(rows))
+        records = [self.row_values(id, values, now) for id, values in zip(ids, rows)]
+        write_rows(self.model.__table__, records)
+        if self.has_genres:
+            link = GENRE_LINKS[self.model]
+            genres = Genre.lookup([name for values in rows for name in values['genres']])
+            db.session.flush()
+            genre_ids = {genre.name: genre.id for genre in genres}
+            write_rows(link.table, [{link.name: id, 'genre_id': genre_ids[name]}
+                                    for id, values in zip(ids, rows) for name in dict.fromkeys(values['genres'])])
+        # Bulk writes skip the flush that tags ORM writes as stale.
+        cache.invalidate(*self.tags)
+        return ids
+
+
+class CountedImporter(Importer):
+
+    def row_values(self, id, values, now):
+        row = super(CountedImporter, self).row_values(id, values, now)
+        row.update({'upcoming_shows_count': 0, 'next_show_time': None})
+        return row
+
+
+class ShowImporter(Importer):
+
+    def formdata(self, row):
+        data = super(ShowImporter, self).formdata(row)
+        try:
+            data['start_time'] = as_utc(row['start_time']).strftime('%Y-%m-%d %H:%M:%S')
+        except (KeyError, AttributeError, TypeError, ValueError, OverflowError):
+            pass
+        return data
+
+    def validate(self, row):
+        values, errors = super(ShowImporter, self).validate(row)
+        if values:
+            values['start_time'] = as_utc(values['start_time'])
+            values['duration'] = values['duration'] or current_app.config['SHOW_DEFAULT_DURATION']
+        return values, errors
+
+    def check(self, rows, lock=False):
+        # lock holds off other bookings of the same venues and artists until
+        # the transaction ends: their rows are taken FOR UPDATE, or on SQLite,
+        # which has no row locks and ignores FOR UPDATE, the whole database's
+        # write lock is taken before anything is read.
+        venues = db.session.query(Venue.id).filter(Venue.id.in_({values['venue_id'] for values in rows}))
+        artists = db.session.query(Artist.id).filter(Artist.id.in_({values['artist_id'] for values in rows}))
+        if lock and db.session.get_bind().dialect.name == 'sqlite':
+            # An UPDATE that matches nothing still begins a write transaction.
+            db.session.execute(Show.__table__.update().where(false()).values(id=Show.__table__.c.id))
+        elif lock:
+            venues, artists = venues.with_for_update(), artists.with_for_update()
+        venues = {id for id, in venues}
+        artists = {id for id, in artists}
+        errors = {}
+        for position, values in enumerate(rows):
+            if values['venue_id'] not in venues:
+                errors.setdefault(position, {})['venue_id'] = ['No venue with this id.']
+            if values['artist_id'] not in artists:
+                errors.setdefault(position, {})['artist_id'] = ['No artist with this id.']
+        return errors
+
+    def insert(self, rows):
+        ids = super(ShowImporter, self).insert(rows)
+        venue_ids = {values['venue_id'] for values in rows}
+        artist_ids = {values['artist_id'] for values in rows}
+        refresh_show_counters(Venue, Show.venue_id, Venue.id.in_(venue_ids))
+        refresh_show_counters(Artist, Show.artist_id, Artist.id.in_(artist_ids))
+        cache.invalidate('venues', *['venue:%d' % id for id in venue_ids] + ['artist:%d' % id for id in artist_ids])
+        return ids
+
+
+IMPORTERS = {
+    'venues': CountedImporter(
+        Venue, VenueForm,
+        ['name', 'city', 'state', 'address', 'phone', 'image_link', 'facebook_link', 'website',
+         'seeking_talent', 'seeking_description'],
+        has_genres=True, tags=('venues', INDEX_TAGS[Venue])),
+    'artists': CountedImporter(
+        Artist, ArtistForm,
+        ['name', 'city', 'state', 'phone', 'image_link', 'facebook_link', 'website',
+         'seeking_venue', 'seeking_description'],
+        has_genres=True, tags=('artists', INDEX_TAGS[Artist])),
+    'shows': ShowImporter(Show, ShowForm, ['venue_id', 'artist_id', 'start_time', 'duration'], has_genres=False,
+                          tags=('shows',)),
+}
+
+
+def write_rows(table, rows):
+    if not rows:
+        return
+    if db.session.get_bind().dialect.name == 'postgresql':
+        copy_rows(table, rows)
+    else:
+        db.session.execute(table.insert(), rows)
+
+
+def copy_rows(table, rows):
+    # COPY ... FROM STDIN on the session's own connection, so it commits or
+    # rolls back with the rest of the chunk. QUOTE_NONNUMERIC keeps None (NULL)
+    # apart from the empty string.
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+    for row in rows:
+        writer.writerow([row[column].isoformat() if hasattr(row[column], 'isoformat') else row[column]
+                         for column in columns])
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert('COPY "%s" (%s) FROM STDIN WITH (FORMAT csv)'
+                       % (table.name, ', '.join('"%s"' % column for column in columns)), buffer)
+
+
+def import_file(kind, path, chunk_size, rejects, format=None):
+    # Returns (imported, rejected). Each chunk is its own transaction.
+    importer = IMPORTERS[kind]
+    imported = rejected = 0
+    for chunk in chunks(read_rows(path, format), chunk_size):
+        valid = []
+        for line, row in chunk:
+            values, errors = importer.validate(row)
+            if errors:
+                rejects.write(json.dumps({'line': line, 'row': row, 'errors': errors}) + '\n')
+                rejected += 1
+            else:
+                valid.append((line, row, values))
+        errors = importer.check([values for line, row, values in valid])
+        for position in sorted(errors, reverse=True):
+            line, row, values = valid.pop(position)
+            rejects.write(json.dumps({'line': line, 'row': row, 'errors': errors[position]}) + '\n')
+            rejected += 1
+        if valid:
+            importer.insert([values for line, row, values in valid])
+            db.session.commit()
+            imported += len(valid)
+    return imported, rejected
+
+
+@click.command('import')
+@click.argument('kind', type=click.Choice(sorted(IMPORTERS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+@click.option('--chunk-size', type=int, default=None, help='Rows per INSERT/COPY and transaction.')
+@click.option('--rejects', type=click.Path(dir_okay=False), default=None,
+              help='Where rejected rows are written (default: PATH.rejects.jsonl).')
+@with_appcontext
+def import_command(kind, path, format, chunk_size, rejects):
+    """Bulk import venues, artists or shows from CSV or JSON lines."""
+    chunk_size = chunk_size or current_app.config['IMPORT_CHUNK_SIZE']
+    rejects = rejects or path + '.rejects.jsonl'
+    started = time.perf_counter()
+    with open(rejects, 'w') as rejects_file:
+        imported, rejected = import_file(kind, path, chunk_size, rejects_file, format)
+    elapsed = time.perf_counter() - started
+    click.echo('%s: %d imported, %d rejected (see %s) in %.2fs, %.0f rows/s'
+               % (kind, imported, rejected, rejects, elapsed, (imported + rejected) / (elapsed or 1)))
@@ -0,0 +1,107 @@
+from flask import current_app
+from sqlalchemy import func, or_
+
+from models import db, Venue, Artist, Show, Genre, GENRE_LINKS, utc_now
+
+
+# ----------------------------------------------------------------------------#
+# Detail page loaders.
+# ----------------------------------------------------------------------------#
+
+def load_detail(entity, foreign_key, counterpart, show_info, now=None, past_limit=None):
+    # Loads every upcoming show of the entity plus its most recent past shows
+    # in one query, eager loading the *other* side of each show (the artist on
+    # a venue page, the venue on an artist page), then splits them by time.
+    if now is None:
+        now = utc_now()
+    if past_limit is None:
+        past_limit = current_app.config['PAST_SHOWS_LIMIT']
+
+    recent_past = db.session.query(Show.id).filter(
+        foreign_key == entity.id, Show.start_time <= now
+    ).order_by(Show.start_time.desc()).limit(past_limit + 1)
+    shows = Show.query.options(db.joinedload(counterpart)).filter(foreign_key == entity.id).filter(
+        or_(Show.start_time > now, Show.id.in_(recent_past.subquery()))
+    ).order_by(Show.start_time).all()
+
+    upcoming_shows = [show for show in shows if show.start_time_utc > now]
+    past_shows = [show for show in reversed(shows) if show.start_time_utc <= now]
+    past_shows_count = len(past_shows)
+    if past_shows_count > past_limit:
+        # Only the first page of history is loaded; count the rest in SQL.
+        past_shows = past_shows[:past_limit]
+        past_shows_count = db.session.query(func.count(Show.id)).filter(
+            foreign_key == entity.id, Show.start_time <= now
+        ).scalar()
+
+    data = entity.info()
+    data['upcoming_shows'] = list(map(show_info, upcoming_shows))
+    data['upcoming_shows_count'] = len(upcoming_shows)
+    data['past_shows'] = list(map(show_info, past_shows))
+    data['past_shows_count'] = past_shows_count
+    return data
+
+
+def load_venue_detail(venue_id, now=None, past_limit=None):
+    venue = Venue.query.get(venue_id)
+    if venue is None:
+        return None
+    return load_detail(venue, Show.venue_id, Show.Artist, Show.artist_info, now, past_limit)
+
+
+def load_artist_detail(artist_id, now=None, past_limit=None):
+    artist = Artist.query.get(artist_id)
+    if artist is None:
+        return None
+    return load_detail(artist, Show.artist_id, Show.Venue, Show.venue_info, now, past_limit)
+
+
+# ----------------------------------------------------------------------------#
+# Streaming loaders.
+# ----------------------------------------------------------------------------#
+#
+# Full listings for exports. Rows come off a server-side cursor batch_size at a
+# time (yield_per), so memory stays flat however large the table is.
+
+def genre_names(model, ids):
+    link = GENRE_LINKS[model]
+    names = {id: [] for id in ids}
+    for id, name in db.session.query(link, Genre.name).join(
+            Genre, Genre.id == link.table.c.genre_id).filter(link.in_(ids)).order_by(link, Genre.name):
+        names[id].append(name)
+    return names
+
+
+def iter_entities(model, batch_size):
+    # Genres are a collection, which yield_per cannot eager load, so they are
+    # fetched with one query per batch instead of one per row.
+    batch = []
+    for entity in model.query.order_by(model.id).yield_per(batch_size):
+        batch.append(entity)
+        if len(batch) == batch_size:
+            yield from entity_infos(model, batch)
+            batch = []
+    yield from entity_infos(model, batch)
+
+
+def entity_infos(model, entities):
+    if not entities:
+        return
+    genres = genre_names(model, [entity.id for entity in entities])
+    for entity in entities:
+        data = entity.short_response()
+        data.update({
+            'city': entity.city,
+            'state': entity.state,
+            'genres': genres[entity.id],
+            'upcoming_shows_count': entity.upcoming_shows_count,
+            'next_show_time': entity.next_show_time
+        })
+        yield data
+
+
+def iter_shows(batch_size):
+    query = Show.query.options(db.joinedload(Show.Venue), db.joinedload(Show.Artist)).order_by(
+        Show.start_time, Show.id)
+    for show in query.yield_per(batch_size):
+        yield show.info()
@@ -0,0 +1,182 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+
+from flask import g, has_request_context, request, request_finished, request_started
+
+
+# ----------------------------------------------------------------------------#
+# Logging.
+# ----------------------------------------------------------------------------#
+#
+# app.logger and one line per request go to LOG_FILE as JSON lines. Request
+# threads only put records on an in-memory queue; a listener thread in each
+# process does the encoding and the file I/O, so a slow disk never holds up a
+# request. When the queue is full, lines are dropped and counted instead.
+# Every worker appends to the same file: whichever rolls it over renames it,
+# and the others reopen the new file on their next line.
+#
+# Each request gets an id, taken from X-Request-ID when a proxy (or Heroku's
+# router) set one, and sent back in that header, so a line can be matched to
+# the proxy's log. LOG_SAMPLE_RATE thins out the lines of successful requests.
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+REQUEST_ID = re.compile(r'^[\w.:-]{1,128}$')
+
+# Record attributes written when present, in this order.
+FIELDS = ('request_id', 'method', 'path', 'endpoint', 'status', 'duration_ms', 'remote_addr')
+
+
+class JSONFormatter(logging.Formatter):
+
+    def format(self, record):
+        line = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'pid': record.process,
+            'message': record.getMessage(),
+        }
+        for field in FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                line[field] = value
+        if record.exc_text:
+            line['exception'] = record.exc_text
+        return json.dumps(line, default=str)
+
+
+class RequestFields(logging.Filter):
+    # Runs in the thread that logs, while the request is still at hand.
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.method = request.method
+            record.path = request.path
+            record.endpoint = request.endpoint
+        return True
+
+
+class BackgroundHandler(QueueHandler):
+    # Hands records to a listener thread over a bounded queue. The thread is
+    # started by the first record of each process, so a worker forked from a
+    # preloaded master gets its own thread and queue. emit() runs under the
+    # handler's lock, which start() and stop() share.
+
+    def __init__(self, target, size):
+        super(BackgroundHandler, self).__init__(None)
+        self.target = target
+        self.size = size
+        self.listener = None
+        self.pid = None
+        self.dropped = 0
+        self.addFilter(RequestFields())
+
+    def start(self):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.queue = queue.Queue(self.size)
+                self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+                self.listener.start()
+                self.pid = os.getpid()
+
+    def stop(self):
+        # Writes out what is queued; at exit and before the app goes away.
+        with self.lock:
+            if self.pid == os.getpid():
+                self.listener.stop()
+                self.pid = None
+
+    def prepare(self, record):
+        # Only what needs this thread is done here: the message and traceback
+        # become plain text, and the JSON encoding is left to the listener.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self.target.formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self.pid != os.getpid():
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RequestLog(object):
+
+    def __init__(self):
+        self.handler = None
+        self.access = None
+
+    def init_app(self, app):
+        access = logging.getLogger(app.logger.name + '.requests')
+        for logger in (app.logger, access):
+            for handler in [h for h in logger.handlers if isinstance(h, BackgroundHandler)]:
+                logger.removeHandler(handler)
+                handler.stop()
+        if not app.config['LOG_FILE']:
+            return
+
+        if app.config['LOG_FILE'] == '-':
+            target = logging.StreamHandler(sys.stdout)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(app.config['LOG_FILE'])), exist_ok=True)
+            target = WatchedFileHandler(app.config['LOG_FILE'], delay=True)
+        target.setFormatter(JSONFormatter())
+        self.handler = BackgroundHandler(target, app.config['LOG_QUEUE_SIZE'])
+        atexit.register(self.handler.stop)
+
+        level = app.config['LOG_LEVEL']
+        app.logger.setLevel(level)
+        app.logger.addHandler(self.handler)
+        access.setLevel(logging.INFO)
+        access.propagate = False
+        access.addHandler(self.handler)
+        self.access = access
+        request_started.connect(self.start_request, app)
+        request_finished.connect(self.finish_request, app)
+
+    def start_request(self, sender, **extra):
+        g.request_started = time.perf_counter()
+        request_id = request.headers.get(REQUEST_ID_HEADER, '')
+        g.request_id = request_id if REQUEST_ID.match(request_id) else uuid.uuid4().hex
+
+    def finish_request(self, sender, response, **extra):
+        started = g.pop('request_started', None)
+        if started is None:
+            return
+        response.headers[REQUEST_ID_HEADER] = g.request_id
+        status = response.status_code
+        if status < 400 and random.random() >= sender.config['LOG_SAMPLE_RATE']:
+            return
+        self.access.log(logging.WARNING if status >= 500 else logging.INFO,
+                        '%s %s %d', request.method, request.full_path.rstrip('?'), status, extra={
+                            'status': status,
+                            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+                            'remote_addr': request.remote_addr,
+                        })
+
+    def stats(self):
+        # Lines dropped by this worker because the writer thread fell behind.
+        handler = self.handler
+        return {'pid': os.getpid(), 'dropped': handler.dropped if handler else 0,
+                'queued': handler.queue.qsize() if handler and handler.pid == os.getpid() else 0}
+
+
+request_log = RequestLog()
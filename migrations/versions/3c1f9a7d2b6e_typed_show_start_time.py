@@ -0,0 +1,83 @@
+"""typed show start_time with venue/artist time indexes
+
+Revision ID: 3c1f9a7d2b6e
+Revises: e4ec8a9d3504
+Create Date: 2026-10-18 09:40:51.207914
+
+"""
+from datetime import timezone
+
+from alembic import op
+import dateutil.parser
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f9a7d2b6e'
+down_revision = 'e4ec8a9d3504'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+show = sa.table(
+    'Show',
+    sa.column('id', sa.Integer),
+    sa.column('start_time', sa.String),
+    sa.column('start_time_ts', sa.DateTime(timezone=True)),
+)
+
+
+def parse_start_time(value):
+    date = dateutil.parser.parse(value)
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date
+
+
+def copy_in_batches(connection, source, target, convert):
+    # Walk the table by primary key so each batch is a short index range scan
+    # and no batch holds more than BATCH_SIZE rows in memory.
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select([show.c.id, source])
+            .where(show.c.id > last_id)
+            .order_by(show.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        connection.execute(
+            show.update()
+            .where(show.c.id == sa.bindparam('show_id'))
+            .values({target.name: sa.bindparam('value')}),
+            [{'show_id': row[0], 'value': convert(row[1])} for row in rows]
+        )
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    op.add_column('Show', sa.Column('start_time_ts', sa.DateTime(timezone=True), nullable=True))
+    copy_in_batches(op.get_bind(), show.c.start_time, show.c.start_time_ts, parse_start_time)
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.drop_column('start_time')
+        batch_op.alter_column('start_time_ts', new_column_name='start_time',
+                              existing_type=sa.DateTime(timezone=True), nullable=False)
+    op.create_index('ix_Show_venue_id_start_time', 'Show', ['venue_id', 'start_time'])
+    op.create_index('ix_Show_artist_id_start_time', 'Show', ['artist_id', 'start_time'])
+
+
+def downgrade():
+    op.drop_index('ix_Show_artist_id_start_time', table_name='Show')
+    op.drop_index('ix_Show_venue_id_start_time', table_name='Show')
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.alter_column('start_time', new_column_name='start_time_ts',
+                              existing_type=sa.DateTime(timezone=True), nullable=True)
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.add_column(sa.Column('start_time', sa.String(), nullable=True))
+    copy_in_batches(op.get_bind(), show.c.start_time_ts, show.c.start_time,
+                    lambda value: value.strftime('%Y-%m-%d %H:%M:%S'))
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.drop_column('start_time_ts')
+        batch_op.alter_column('start_time', existing_type=sa.String(), nullable=False)
@@ -0,0 +1,29 @@
+"""updated_at columns
+
+Revision ID: 5d7a0c93e1f4
+Revises: 8b5e2d41c7a9
+Create Date: 2026-10-18 11:05:12.430876
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d7a0c93e1f4'
+down_revision = '8b5e2d41c7a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('Venue', 'Artist', 'Show'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False,
+                                          server_default=sa.text('CURRENT_TIMESTAMP')))
+
+
+def downgrade():
+    for table in ('Show', 'Artist', 'Venue'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('updated_at')
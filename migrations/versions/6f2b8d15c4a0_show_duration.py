@@ -0,0 +1,27 @@
+"""show duration for double-booking checks
+
+Revision ID: 6f2b8d15c4a0
+Revises: c92f4b1a7e53
+Create Date: 2026-10-18 14:05:12.418337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f2b8d15c4a0'
+down_revision = 'c92f4b1a7e53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing shows are given the default length of two hours.
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.add_column(sa.Column('duration', sa.Integer(), nullable=False, server_default=sa.text('120')))
+
+
+def downgrade():
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.drop_column('duration')
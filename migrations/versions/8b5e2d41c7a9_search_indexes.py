@@ -0,0 +1,37 @@
+"""pg_trgm and full-text search indexes for venues and artists
+
+Revision ID: 8b5e2d41c7a9
+Revises: 3c1f9a7d2b6e
+Create Date: 2026-10-18 10:21:37.864105
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b5e2d41c7a9'
+down_revision = '3c1f9a7d2b6e'
+branch_labels = None
+depends_on = None
+
+# Must match search.search_document() exactly for the planner to use it.
+SEARCH_DOCUMENT = "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(city, '') || ' ' || coalesce(genres, ''))"
+
+
+def upgrade():
+    # Other databases search through the in-process fallback index.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table in ('Venue', 'Artist'):
+        op.execute('CREATE INDEX "ix_{0}_name_trgm" ON "{0}" USING gin (name gin_trgm_ops)'.format(table))
+        op.execute('CREATE INDEX "ix_{0}_search_document" ON "{0}" USING gin ({1})'.format(table, SEARCH_DOCUMENT))
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table in ('Venue', 'Artist'):
+        op.execute('DROP INDEX IF EXISTS "ix_{0}_search_document"'.format(table))
+        op.execute('DROP INDEX IF EXISTS "ix_{0}_name_trgm"'.format(table))
@@ -0,0 +1,124 @@
+"""normalize genres into a Genre table with association tables
+
+Revision ID: a41d6c8e9f02
+Revises: 5d7a0c93e1f4
+Create Date: 2026-10-18 11:48:26.015392
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41d6c8e9f02'
+down_revision = '5d7a0c93e1f4'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+ENTITIES = (
+    ('Venue', 'venue_genres', 'venue_id'),
+    ('Artist', 'artist_genres', 'artist_id'),
+)
+
+genre = sa.table('Genre', sa.column('id', sa.Integer), sa.column('name', sa.String))
+
+
+def parse_genres(value):
+    # The old column held whatever the form handlers passed in: a PostgreSQL
+    # array literal ('{Jazz,Folk}'), a Python list repr or a single name.
+    value = (value or '').strip()
+    if value[:1] in ('{', '['):
+        value = value[1:-1]
+    names = [name.strip().strip('"\'').strip() for name in value.split(',')]
+    return [name for name in names if name]
+
+
+def search_document(columns):
+    return "to_tsvector('simple', " + " || ' ' || ".join("coalesce(%s, '')" % column for column in columns) + ")"
+
+
+def upgrade():
+    op.create_table(
+        'Genre',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=120), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    for table, links, key in ENTITIES:
+        op.create_table(
+            links,
+            sa.Column(key, sa.Integer(), nullable=False),
+            sa.Column('genre_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint([key], [table + '.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint(key, 'genre_id'),
+        )
+        op.create_index('ix_%s_genre_id_%s' % (links, key), links, ['genre_id', key])
+
+    connection = op.get_bind()
+    genre_ids = {}
+    for table, links, key in ENTITIES:
+        entity = sa.table(table, sa.column('id', sa.Integer), sa.column('genres', sa.String))
+        link = sa.table(links, sa.column(key, sa.Integer), sa.column('genre_id', sa.Integer))
+        last_id = 0
+        while True:
+            rows = connection.execute(
+                sa.select([entity.c.id, entity.c.genres])
+                .where(entity.c.id > last_id)
+                .order_by(entity.c.id)
+                .limit(BATCH_SIZE)
+            ).fetchall()
+            if not rows:
+                break
+            parsed = [(id, list(dict.fromkeys(parse_genres(genres)))) for id, genres in rows]
+            new_names = {name for id, names in parsed for name in names} - set(genre_ids)
+            if new_names:
+                connection.execute(genre.insert(), [{'name': name} for name in new_names])
+                genre_ids.update(connection.execute(
+                    sa.select([genre.c.name, genre.c.id]).where(genre.c.name.in_(new_names))
+                ).fetchall())
+            pairs = [{key: id, 'genre_id': genre_ids[name]} for id, names in parsed for name in names]
+            if pairs:
+                connection.execute(link.insert(), pairs)
+            last_id = rows[-1][0]
+
+    if connection.dialect.name == 'postgresql':
+        for table, links, key in ENTITIES:
+            op.execute('DROP INDEX IF EXISTS "ix_{0}_search_document"'.format(table))
+            op.execute('CREATE INDEX "ix_{0}_search_document" ON "{0}" USING gin ({1})'.format(
+                table, search_document(['name', 'city'])))
+    for table, links, key in ENTITIES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('genres')
+
+
+def downgrade():
+    connection = op.get_bind()
+    for table, links, key in ENTITIES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('genres', sa.String(length=120), nullable=True))
+        entity = sa.table(table, sa.column('id', sa.Integer), sa.column('genres', sa.String))
+        link = sa.table(links, sa.column(key, sa.Integer), sa.column('genre_id', sa.Integer))
+        names = {}
+        for id, name in connection.execute(
+                sa.select([link.c[key], genre.c.name])
+                .select_from(link.join(genre, genre.c.id == link.c.genre_id))
+                .order_by(link.c[key], genre.c.name)):
+            names.setdefault(id, []).append(name)
+        if names:
+            connection.execute(
+                entity.update().where(entity.c.id == sa.bindparam('entity_id')).values(genres=sa.bindparam('value')),
+                [{'entity_id': id, 'value': '{' + ','.join(values) + '}'} for id, values in names.items()]
+            )
+    if connection.dialect.name == 'postgresql':
+        for table, links, key in ENTITIES:
+            op.execute('DROP INDEX IF EXISTS "ix_{0}_search_document"'.format(table))
+            op.execute('CREATE INDEX "ix_{0}_search_document" ON "{0}" USING gin ({1})'.format(
+                table, search_document(['name', 'city', 'genres'])))
+    for table, links, key in ENTITIES:
+        op.drop_index('ix_%s_genre_id_%s' % (links, key), table_name=links)
+        op.drop_table(links)
+    op.drop_table('Genre')
@@ -0,0 +1,30 @@
+"""Stamp table of shared cache tag versions
+
+Revision ID: b7e3f0a92d61
+Revises: 6f2b8d15c4a0
+Create Date: 2026-10-19 10:12:40.215094
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3f0a92d61'
+down_revision = '6f2b8d15c4a0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'Stamp',
+        sa.Column('name', sa.String(length=120), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('Stamp')
@@ -0,0 +1,49 @@
+"""maintained upcoming show counters on Venue and Artist
+
+Revision ID: c92f4b1a7e53
+Revises: a41d6c8e9f02
+Create Date: 2026-10-18 12:37:55.981240
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c92f4b1a7e53'
+down_revision = 'a41d6c8e9f02'
+branch_labels = None
+depends_on = None
+
+COUNTED = (
+    ('Venue', 'venue_id'),
+    ('Artist', 'artist_id'),
+)
+
+
+def upgrade():
+    for table, key in COUNTED:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('upcoming_shows_count', sa.Integer(), nullable=False,
+                                          server_default=sa.text('0')))
+            batch_op.add_column(sa.Column('next_show_time', sa.DateTime(timezone=True), nullable=True))
+            batch_op.create_index('ix_%s_next_show_time' % table, ['next_show_time'])
+
+    # Backfill from the shows, the same recount that check-counters does.
+    now = sa.func.current_timestamp()
+    show = sa.table('Show', sa.column('venue_id'), sa.column('artist_id'), sa.column('start_time'))
+    for table, key in COUNTED:
+        entity = sa.table(table, sa.column('id'), sa.column('upcoming_shows_count'), sa.column('next_show_time'))
+        upcoming = sa.and_(show.c[key] == entity.c.id, show.c.start_time > now)
+        op.execute(entity.update().values(
+            upcoming_shows_count=sa.select([sa.func.count()]).where(upcoming).as_scalar(),
+            next_show_time=sa.select([sa.func.min(show.c.start_time)]).where(upcoming).as_scalar(),
+        ))
+
+
+def downgrade():
+    for table, key in COUNTED:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_index('ix_%s_next_show_time' % table)
+            batch_op.drop_column('next_show_time')
+            batch_op.drop_column('upcoming_shows_count')
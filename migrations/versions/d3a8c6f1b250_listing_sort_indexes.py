@@ -0,0 +1,28 @@
+"""indexes for the show listing and venue directory sort keys
+
+Revision ID: d3a8c6f1b250
+Revises: b7e3f0a92d61
+Create Date: 2026-10-19 15:32:08.604417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a8c6f1b250'
+down_revision = 'b7e3f0a92d61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Show_start_time_id', 'Show', ['start_time', 'id'])
+    # Must match pagination.non_null() exactly for the planner to use it.
+    op.create_index('ix_Venue_directory', 'Venue',
+                    [sa.text("coalesce(state, '')"), sa.text("coalesce(city, '')"), 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_Venue_directory', table_name='Venue')
+    op.drop_index('ix_Show_start_time_id', table_name='Show')
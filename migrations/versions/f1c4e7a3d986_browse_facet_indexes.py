@@ -0,0 +1,33 @@
+"""indexes on the browse facet columns
+
+Revision ID: f1c4e7a3d986
+Revises: d3a8c6f1b250
+Create Date: 2026-10-19 16:08:51.277930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c4e7a3d986'
+down_revision = 'd3a8c6f1b250'
+branch_labels = None
+depends_on = None
+
+FACETS = {
+    'Venue': ['state', 'city', 'seeking_talent'],
+    'Artist': ['state', 'city', 'seeking_venue'],
+}
+
+
+def upgrade():
+    for table, columns in FACETS.items():
+        for column in columns:
+            op.create_index(op.f('ix_%s_%s' % (table, column)), table, [column])
+
+
+def downgrade():
+    for table, columns in FACETS.items():
+        for column in columns:
+            op.drop_index(op.f('ix_%s_%s' % (table, column)), table_name=table)
@@ -1,49 +1,142 @@
-from app import Boolean, Integer, String, Column, ForeignKey, DateTime
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+import os
+from datetime import datetime, timezone
+
+from routing import RoutingSQLAlchemy
+from sqlalchemy import (Boolean, Integer, String, Column, ForeignKey, DateTime, and_, func, inspect, literal_column,
+                        select)
 
 # TODO: connect to a local postgresql database
 
 # ----------------------------------------------------------------------------#
 # Models.
 # ----------------------------------------------------------------------------#
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
 
 
 def db_setup(app):
-    app.config.from_object('config')
-    db.app = app
     db.init_app(app)
-    migrate = Migrate(app, db)
     return db
 
 
+def dispose_engines(app):
+    # Drops connections inherited over a fork, so no two processes share a
+    # socket; each process then opens its own on first use.
+    with app.app_context():
+        db.get_engine(app).dispose()
+        for bind in app.config.get('SQLALCHEMY_BINDS') or ():
+            db.get_engine(app, bind=bind).dispose()
+
+
+def pool_stats():
+    # Connection pool usage of this worker process; the pid tells workers apart.
+    pool = db.engine.pool
+    stats = {'pid': os.getpid(), 'pool': type(pool).__name__}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    return stats
+
+
+# Callbacks run after a model insert/update/delete has been committed, so
+# in-process indexes and caches can follow writes without polling.
+listeners = []
+
+
+def subscribe(listener):
+    listeners.append(listener)
+    return listener
+
+
+def publish(action, instance):
+    for listener in listeners:
+        listener(action, instance)
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+def as_utc(value):
+    # Show times are stored as timezone-aware timestamps. Form input and the
+    # legacy string column carry no offset, so those are taken as UTC.
+    if isinstance(value, str):
+        import dateutil.parser
+        value = dateutil.parser.parse(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+venue_genres = db.Table(
+    'venue_genres',
+    Column('venue_id', Integer, ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True),
+    Column('genre_id', Integer, ForeignKey('Genre.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_venue_genres_genre_id_venue_id', 'genre_id', 'venue_id'),
+)
+
+artist_genres = db.Table(
+    'artist_genres',
+    Column('artist_id', Integer, ForeignKey('Artist.id', ondelete='CASCADE'), primary_key=True),
+    Column('genre_id', Integer, ForeignKey('Genre.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_artist_genres_genre_id_artist_id', 'genre_id', 'artist_id'),
+)
+
+
+class Genre(db.Model):
+    __tablename__ = 'Genre'
+    id = Column(Integer, primary_key=True)
+    name = Column(String(120), nullable=False, unique=True)
+
+    @classmethod
+    def lookup(cls, names):
+        # Existing genres for names, creating the missing ones in the session.
+        names = list(dict.fromkeys(name.strip() for name in names if name.strip()))
+        if not names:
+            return []
+        genres = {genre.name: genre for genre in cls.query.filter(cls.name.in_(names))}
+        for name in names:
+            if name not in genres:
+                genres[name] = cls(name=name)
+                db.session.add(genres[name])
+        return [genres[name] for name in names]
+
+
 class Venue(db.Model):
     __tablename__ = 'Venue'
     id = Column(Integer, primary_key=True)
     name = Column(String)
-    city = Column(String(120))
-    state = Column(String(120))
+    # state, city and seeking_talent are browse facets (see facets.py).
+    city = Column(String(120), index=True)
+    state = Column(String(120), index=True)
     address = Column(String(120))
     phone = Column(String(120))
     image_link = Column(String(500))
     facebook_link = Column(String(120))
-    seeking_talent = Column(Boolean, default=False)
+    seeking_talent = Column(Boolean, default=False, index=True)
     seeking_description = Column(String(500))
     website = Column(String(120))
-    genres = Column(String(120))
+    genres = db.relationship('Genre', secondary=venue_genres, order_by=Genre.name)
+    # Maintained by Show.insert/update/delete and the sweep-shows command.
+    upcoming_shows_count = Column(Integer, nullable=False, default=0)
+    next_show_time = Column(DateTime(timezone=True), index=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
     shows = db.relationship('Show', backref='Venue', lazy='dynamic')
 
     def insert(self):
         db.session.add(self)
         db.session.commit()
+        publish('insert', self)
 
     def update(self):
+        # updated_at feeds the iCalendar DTSTAMP (see feeds.py).
+        self.updated_at = utc_now()
         db.session.commit()
+        publish('update', self)
 
     def delete(self):
         db.session.delete(self)
         db.session.commit()
+        publish('delete', self)
 
     def short_response(self):
         return {
@@ -58,7 +151,7 @@ class Venue(db.Model):
             'name': self.name,
             'city': self.city,
             'state': self.state,
-            'genres': self.genres,
+            'genres': [genre.name for genre in self.genres],
             'address': self.address,
             'phone': self.phone,
             'website': self.website,
@@ -70,20 +163,32 @@ class Venue(db.Model):
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
 
 
+# The venue directory's sort key, (state, city, id) with NULL as ''. The
+# expressions must read exactly as pagination.non_null() writes them, with ''
+# inline rather than a bound parameter, for the index to serve the sort.
+db.Index('ix_Venue_directory', func.coalesce(Venue.state, literal_column("''")),
+         func.coalesce(Venue.city, literal_column("''")), Venue.id)
+
+
 class Artist(db.Model):
     __tablename__ = 'Artist'
 
     id = Column(Integer, primary_key=True)
     name = Column(String)
-    city = Column(String(120))
-    state = Column(String(120))
+    # state, city and seeking_venue are browse facets (see facets.py).
+    city = Column(String(120), index=True)
+    state = Column(String(120), index=True)
     phone = Column(String(120))
-    genres = Column(String(120))
+    genres = db.relationship('Genre', secondary=artist_genres, order_by=Genre.name)
     image_link = Column(String(500))
     facebook_link = Column(String(120))
-    seeking_venue = Column(Boolean)
+    seeking_venue = Column(Boolean, index=True)
     seeking_description = Column(String(500))
     website = Column(String)
+    # Maintained by Show.insert/update/delete and the sweep-shows command.
+    upcoming_shows_count = Column(Integer, nullable=False, default=0)
+    next_show_time = Column(DateTime(timezone=True), index=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
     shows = db.relationship('Show', backref='Artist', lazy=True)
 
     def info(self):
@@ -92,7 +197,7 @@ class Artist(db.Model):
             'name': self.name,
             'city': self.city,
             'state': self.state,
-            'genres': self.genres,
+            'genres': [genre.name for genre in self.genres],
             'phone': self.phone,
             'website': self.website,
             'facebook_link': self.facebook_link,
@@ -110,47 +215,108 @@ class Artist(db.Model):
     def insert(self):
         db.session.add(self)
         db.session.commit()
+        publish('insert', self)
 
     def update(self):
+        # updated_at feeds the iCalendar DTSTAMP (see feeds.py).
+        self.updated_at = utc_now()
         db.session.commit()
+        publish('update', self)
 
     def delete(self):
         db.session.delete(self)
         db.session.commit()
+        publish('delete', self)
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
 
 
+GENRE_LINKS = {
+    Venue: venue_genres.c.venue_id,
+    Artist: artist_genres.c.artist_id,
+}
+
+
+def filter_by_genre(query, model, name):
+    # Genre.name (unique) -> (genre_id, entity id) index -> entity primary key.
+    link = GENRE_LINKS[model]
+    return query.join(link.table, link == model.id).join(
+        Genre, Genre.id == link.table.c.genre_id
+    ).filter(Genre.name == name)
+
+
 class Show(db.Model):
     __tablename__ = "Show"
+    # Upcoming/past splits filter on one side of the relationship and a time
+    # range, so both are served by a range scan on the first two indexes. The
+    # show listing and the feeds page and stream in (start_time, id) order.
+    __table_args__ = (
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+    )
     id = Column(Integer, primary_key=True)
-    venue_id = Column(Integer, ForeignKey(Venue.id), nullable=False)
-    artist_id = Column(Integer, ForeignKey(Artist.id), nullable=False)
-    start_time = Column(String, nullable=False)
+    # active_history loads the old value before a change, even on an expired
+    # show, so moving it also refreshes the old side (see refresh_counters).
+    venue_id = db.column_property(Column(Integer, ForeignKey(Venue.id), nullable=False), active_history=True)
+    artist_id = db.column_property(Column(Integer, ForeignKey(Artist.id), nullable=False), active_history=True)
+    start_time = Column(DateTime(timezone=True), nullable=False)
+    # Length in minutes; rows from before scheduling was added get 120.
+    duration = Column(Integer, nullable=False, server_default='120')
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
+
+    @property
+    def start_time_utc(self):
+        # SQLite hands timestamps back without an offset; PostgreSQL does not.
+        return as_utc(self.start_time)
+
+    def refresh_counters(self):
+        # Runs inside the caller's transaction, after a flush, so the counters
+        # commit (or roll back) together with the show itself. A show moved to
+        # another venue or artist refreshes the old one's counters too; the
+        # flush clears the history that names it, so it is read first.
+        state = inspect(self)
+        venue_ids = set(state.attrs.venue_id.history.sum())
+        artist_ids = set(state.attrs.artist_id.history.sum())
+        db.session.flush()
+        venue_ids = (venue_ids | {self.venue_id}) - {None}
+        artist_ids = (artist_ids | {self.artist_id}) - {None}
+        refresh_show_counters(Venue, Show.venue_id, Venue.id.in_(venue_ids))
+        refresh_show_counters(Artist, Show.artist_id, Artist.id.in_(artist_ids))
 
     def insert(self):
         db.session.add(self)
+        self.refresh_counters()
         db.session.commit()
+        publish('insert', self)
 
     def update(self):
+        # updated_at feeds the iCalendar DTSTAMP (see feeds.py).
+        self.updated_at = utc_now()
+        self.refresh_counters()
         db.session.commit()
+        publish('update', self)
 
     def delete(self):
         db.session.delete(self)
+        self.refresh_counters()
         db.session.commit()
+        publish('delete', self)
 
     def info(self):
         return {
+            'id': self.id,
             'venue_id': self.venue_id,
             'venue_name': self.Venue.name,
             'artist_id': self.artist_id,
             'artist_name': self.Artist.name,
             'artist_image_link': self.Artist.image_link,
-            'start_time': self.start_time
+            'start_time': self.start_time,
+            'duration': self.duration
         }
 
     def artist_info(self):
         return {
-            'artist_id': self.venue_id,
+            'artist_id': self.artist_id,
             'artist_name': self.Artist.name,
             'artist_image_link': self.Artist.image_link,
             'start_time': self.start_time
@@ -166,3 +332,47 @@ class Show(db.Model):
 
         }
 # TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
+
+
+class Stamp(db.Model):
+    # The current version of a page cache tag ('venues', 'venue:3', ...),
+    # bumped in the transaction of every write the tag covers (see cache.py).
+    # Every worker and CLI command reads and writes the same rows.
+    __tablename__ = 'Stamp'
+    name = Column(String(120), primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
+
+
+def upcoming_show_counters(foreign_key, entity_id, now):
+    # Correlated (count, next start time) of an entity's upcoming shows, both
+    # answered from the (entity_id, start_time) index.
+    upcoming = and_(foreign_key == entity_id, Show.start_time > now)
+    return (
+        select([func.count(Show.id)]).where(upcoming).as_scalar(),
+        select([func.min(Show.start_time)]).where(upcoming).as_scalar(),
+    )
+
+
+def refresh_show_counters(model, foreign_key, criteria, now=None):
+    # Recomputes the counters of every model row matching criteria in one
+    # UPDATE and returns how many rows it touched.
+    if now is None:
+        now = utc_now()
+    count, next_show_time = upcoming_show_counters(foreign_key, model.id, now)
+    return db.session.execute(
+        model.__table__.update().where(criteria).values(
+            upcoming_shows_count=count, next_show_time=next_show_time
+        )
+    ).rowcount
+
+
+def next_show_start(foreign_key, entity_id, now=None):
+    # When the entity's next show starts, and moves from upcoming to past on
+    # its detail page; None when it has none coming. One index range scan.
+    if now is None:
+        now = utc_now()
+    start = db.session.query(func.min(Show.start_time)).filter(
+        foreign_key == entity_id, Show.start_time > now
+    ).scalar()
+    return start and as_utc(start)
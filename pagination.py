@@ -0,0 +1,104 @@
+import base64
+import json
+from collections import namedtuple
+
+from flask import abort, current_app, request, url_for
+from sqlalchemy import DateTime, func, literal_column, tuple_
+
+from models import as_utc
+
+
+# ----------------------------------------------------------------------------#
+# Keyset pagination.
+# ----------------------------------------------------------------------------#
+#
+# Pages are addressed by the sort key of the row they start after (?after=) or
+# end before (?before=) instead of an OFFSET, so every page is one index range
+# scan of page_size + 1 rows no matter how deep into the listing it is.
+#
+# A row-value comparison never matches NULL, so every sort column must be NOT
+# NULL; a nullable one is sorted as coalesce(column, '') under its own name
+# (see non_null).
+
+Page = namedtuple('Page', ['items', 'next_cursor', 'prev_cursor'])
+
+
+def encode_cursor(values):
+    values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def non_null(column):
+    # A sort key for a nullable string column: NULL sorts (and pages) as ''.
+    # The '' is inline, not a bound parameter, so an index on the same
+    # expression (see ix_Venue_directory) can serve the sort.
+    return func.coalesce(column, literal_column("''")).label(column.key)
+
+
+def decode_cursor(cursor, columns):
+    # Raises ValueError for a cursor that was not made by encode_cursor for
+    # these columns.
+    values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError('cursor does not match the sort key')
+    decoded = []
+    for value, column in zip(values, columns):
+        try:
+            if isinstance(column.type, DateTime):
+                value = as_utc(value)
+            elif not isinstance(value, column.type.python_type):
+                raise ValueError('cursor value %r is not a %s' % (value, column.type.python_type.__name__))
+        except (AttributeError, TypeError, OverflowError) as e:
+            raise ValueError(str(e))
+        decoded.append(value)
+    return decoded
+
+
+def keyset_page(query, columns, after=None, before=None, page_size=None):
+    # columns is the full sort key, ending in a unique column. Items are
+    # returned in ascending order whichever direction was requested. Raises
+    # ValueError for a bad cursor.
+    if page_size is None:
+        page_size = current_app.config['LISTING_PAGE_SIZE']
+    key = tuple_(*columns)
+
+    after_values = decode_cursor(after, columns) if after else None
+    before_values = decode_cursor(before, columns) if before else None
+    if before_values is not None:
+        query = query.filter(key < tuple_(*before_values)).order_by(*[column.desc() for column in columns])
+    else:
+        if after_values is not None:
+            query = query.filter(key > tuple_(*after_values))
+        query = query.order_by(*columns)
+
+    rows = query.limit(page_size + 1).all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if before_values is not None:
+        rows.reverse()
+
+    def cursor_for(row):
+        return encode_cursor([getattr(row, column.key) for column in columns])
+
+    if before_values is not None:
+        next_cursor = cursor_for(rows[-1]) if rows else before
+        prev_cursor = cursor_for(rows[0]) if rows and has_more else None
+    else:
+        next_cursor = cursor_for(rows[-1]) if rows and has_more else None
+        prev_cursor = cursor_for(rows[0]) if rows and after_values is not None else None
+    return Page(rows, next_cursor, prev_cursor)
+
+
+def request_page(query, columns):
+    # A cursor that does not decode is a 400, not silently the first page.
+    try:
+        return keyset_page(query, columns, after=request.args.get('after'), before=request.args.get('before'))
+    except ValueError:
+        abort(400, 'Invalid page cursor.')
+
+
+def page_url(**cursor):
+    # The current listing URL with its filters kept and the cursor replaced.
+    args = {key: value for key, value in request.args.items() if key not in ('after', 'before')}
+    args.update(cursor)
+    return url_for(request.endpoint, **dict(request.view_args, **args))
@@ -0,0 +1,140 @@
+import cProfile
+import os
+import re
+import threading
+import time
+
+from flask import g, request, request_finished, request_started, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# ----------------------------------------------------------------------------#
+# Request instrumentation.
+# ----------------------------------------------------------------------------#
+#
+# Every request counts its SQL statements and the time spent in them (cursor
+# events on every engine, replicas included) and in template rendering (Flask's
+# template signals). The totals go out as a Server-Timing header, are added up
+# per endpoint for /api/profile/stats, and with PROFILE_THRESHOLD_MS set, each
+# request runs under cProfile and those slower than the threshold are written
+# to PROFILE_DIR as .prof files (snakeviz, or flameprof for a flame graph).
+# The signals need blinker.
+#
+# A streamed body (the /api/v1 lists, the feeds) runs its queries after the
+# headers have gone out. Server-Timing can only cover what ran before that;
+# the per-endpoint totals and the profile are closed once the body has been
+# sent, so they include it.
+
+class RequestTimings(object):
+
+    def __init__(self, profile):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.render = 0.0
+        self.render_started = None
+        self.profile = profile
+
+
+class Profiler(object):
+
+    def __init__(self):
+        self.stats = {}
+        # gthread workers finish requests on several threads at once.
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        request_started.connect(self.start_request, app)
+        request_finished.connect(self.finish_request, app)
+        before_render_template.connect(self.start_render, app)
+        template_rendered.connect(self.finish_render, app)
+        if not event.contains(Engine, 'before_cursor_execute', self.start_query):
+            event.listen(Engine, 'before_cursor_execute', self.start_query)
+            event.listen(Engine, 'after_cursor_execute', self.finish_query)
+
+    def current(self):
+        # The running request's timings, or None outside a request of this app.
+        return g.get('timings') if g else None
+
+    def start_request(self, sender, **extra):
+        profile = None
+        if sender.config['PROFILE_THRESHOLD_MS']:
+            profile = cProfile.Profile()
+            profile.enable()
+        g.timings = RequestTimings(profile)
+
+    def start_query(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def finish_query(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        timings = self.current()
+        if timings is not None:
+            timings.queries += 1
+            timings.db += time.perf_counter() - started
+
+    def start_render(self, sender, template, context, **extra):
+        timings = self.current()
+        if timings is not None and timings.render_started is None:
+            timings.render_started = time.perf_counter()
+
+    def finish_render(self, sender, template, context, **extra):
+        timings = self.current()
+        if timings is not None and timings.render_started is not None:
+            timings.render += time.perf_counter() - timings.render_started
+            timings.render_started = None
+
+    def finish_request(self, sender, response, **extra):
+        timings = g.get('timings')
+        if timings is None:
+            return
+        if sender.config['SERVER_TIMING']:
+            elapsed = time.perf_counter() - timings.started
+            response.headers['Server-Timing'] = 'db;dur=%.1f;desc="%d queries", render;dur=%.1f, total;dur=%.1f' % (
+                timings.db * 1000, timings.queries, timings.render * 1000, elapsed * 1000)
+
+        # The request is gone by the time a streamed body has been sent.
+        endpoint, method, path = request.endpoint or 'unmatched', request.method, request.full_path
+        if response.is_streamed and not response.direct_passthrough:
+            response.call_on_close(lambda: self.close_request(sender, timings, endpoint, method, path))
+        else:
+            self.close_request(sender, timings, endpoint, method, path)
+
+    def close_request(self, app, timings, endpoint, method, path):
+        total = time.perf_counter() - timings.started
+        if timings.profile is not None:
+            timings.profile.disable()
+
+        with self.lock:
+            stats = self.stats.setdefault(endpoint, {'requests': 0, 'queries': 0, 'db_ms': 0.0,
+                                                     'render_ms': 0.0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['requests'] += 1
+            stats['queries'] += timings.queries
+            stats['db_ms'] += timings.db * 1000
+            stats['render_ms'] += timings.render * 1000
+            stats['total_ms'] += total * 1000
+            stats['max_ms'] = max(stats['max_ms'], total * 1000)
+
+        threshold = app.config['PROFILE_THRESHOLD_MS']
+        if timings.profile is not None and total * 1000 >= threshold:
+            dumped = self.dump(timings.profile, endpoint, total, app.config['PROFILE_DIR'])
+            app.logger.warning('slow request %s %s: %.0fms, %d queries in %.0fms, render %.0fms, profile in %s',
+                               method, path, total * 1000, timings.queries, timings.db * 1000,
+                               timings.render * 1000, dumped)
+
+    def totals(self):
+        # A copy of the per-endpoint totals, safe to serialise.
+        with self.lock:
+            return {endpoint: dict(stats) for endpoint, stats in self.stats.items()}
+
+    def dump(self, profile, endpoint, total, directory):
+        os.makedirs(directory, exist_ok=True)
+        name = '%s-%s-%dms-%d.prof' % (time.strftime('%Y%m%dT%H%M%S'), re.sub(r'[^\w.-]', '_', endpoint),
+                                       total * 1000, os.getpid())
+        path = os.path.join(directory, name)
+        profile.dump_stats(path)
+        return path
+
+
+profiler = Profiler()
@@ -0,0 +1,82 @@
+import random
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import event, orm
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+
+
+# ----------------------------------------------------------------------------#
+# Read replicas.
+# ----------------------------------------------------------------------------#
+#
+# Replicas are SQLALCHEMY_BINDS named replica0, replica1, ... (see
+# DATABASE_REPLICA_URLS in config.py). Reads in GET and HEAD requests, and in
+# views marked @replica_reads, go to one replica picked per request. Flushes,
+# INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE and raw SQL go to the primary,
+# as does everything outside a request (the CLI commands, migrations). A
+# committed write keeps that client on the primary for REPLICA_STICKY_SECONDS,
+# through its Flask session, so it reads its own writes while replicas catch up.
+
+REPLICA_PREFIX = 'replica'
+STICKY_KEY = '_primary_until'
+
+
+def replica_binds(app):
+    return sorted(key for key in app.config.get('SQLALCHEMY_BINDS') or () if key.startswith(REPLICA_PREFIX))
+
+
+def replica_reads(view):
+    # For read-only views that are not GETs, such as the search form posts.
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.replica_reads = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def reads_from_replica():
+    if not has_request_context():
+        return False
+    if request.method not in ('GET', 'HEAD') and not g.get('replica_reads'):
+        return False
+    return session.get(STICKY_KEY, 0) < time.time()
+
+
+def is_write(clause):
+    return isinstance(clause, (UpdateBase, TextClause)) or getattr(clause, '_for_update_arg', None) is not None
+
+
+class RoutingSession(SignallingSession):
+
+    def __init__(self, db, **options):
+        super(RoutingSession, self).__init__(db, **options)
+        self.replica = None
+        self.wrote = False
+
+    def get_bind(self, mapper=None, clause=None):
+        if self._flushing or is_write(clause):
+            self.wrote = True
+        elif not self.wrote and reads_from_replica():
+            if self.replica is None:
+                binds = replica_binds(self.app)
+                self.replica = random.choice(binds) if binds else False
+            if self.replica:
+                return get_state(self.app).db.get_engine(self.app, bind=self.replica)
+        return super(RoutingSession, self).get_bind(mapper, clause)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def stick_to_primary(db_session):
+    if db_session.wrote and has_request_context():
+        session[STICKY_KEY] = time.time() + current_app.config['REPLICA_STICKY_SECONDS']
+    db_session.wrote = False
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
@@ -0,0 +1,142 @@
+import bisect
+import json
+from datetime import timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import or_
+
+from forms import SHOW_MAX_DURATION
+from importer import IMPORTERS, chunks, read_rows
+from models import db, Venue, Artist, Show, as_utc, publish, refresh_show_counters
+
+
+# ----------------------------------------------------------------------------#
+# Show scheduling.
+# ----------------------------------------------------------------------------#
+#
+# A batch of (artist_id, venue_id, start_time, duration) rows is validated with
+# the show form, then checked for double bookings against a single query: every
+# existing show of the batch's venues and artists that could overlap the
+# batch's time span. Those shows go into a sorted interval index per venue and
+# per artist. Each accepted row is added to the same index, so rows in one
+# batch are checked against each other too. The accepted rows are inserted in
+# one transaction.
+
+class Bookings(object):
+    # Sorted (start, end, label) intervals per venue or artist. No show is
+    # longer than span, so only shows starting after start - span can still be
+    # running at start.
+
+    def __init__(self, span):
+        self.span = span
+        self.intervals = {}
+
+    def add(self, key, start, end, label):
+        bisect.insort(self.intervals.setdefault(key, []), (start, end, label))
+
+    def conflicts(self, key, start, end):
+        intervals = self.intervals.get(key, [])
+        low = bisect.bisect_left(intervals, (start - self.span,))
+        high = bisect.bisect_left(intervals, (end,))
+        return [label for other_start, other_end, label in intervals[low:high] if other_end > start]
+
+
+def show_end(start, duration):
+    return start + timedelta(minutes=duration)
+
+
+def booked_shows(rows, span):
+    start = min(values['start_time'] for values in rows) - span
+    end = max(show_end(values['start_time'], values['duration']) for values in rows)
+    return db.session.query(Show.id, Show.venue_id, Show.artist_id, Show.start_time, Show.duration).filter(
+        or_(Show.venue_id.in_({values['venue_id'] for values in rows}),
+            Show.artist_id.in_({values['artist_id'] for values in rows})),
+        Show.start_time >= start, Show.start_time < end
+    )
+
+
+def schedule(rows, dry_run=False, offset=0):
+    # Returns one result per row, in order, with status 'scheduled' (and the
+    # new show id), 'valid' (dry run) or 'rejected' (and the errors). Rows are
+    # numbered from offset in the results and in conflict messages.
+    importer = IMPORTERS['shows']
+    results = []
+    valid = []
+    for position, row in enumerate(rows):
+        values, errors = importer.validate(row)
+        results.append({'row': offset + position, 'status': 'rejected' if errors else 'valid'})
+        if errors:
+            results[position]['errors'] = errors
+        else:
+            valid.append((position, values))
+
+    # Locks the venues and artists, so concurrent batches cannot book the
+    # same slot between this check and the commit.
+    errors = importer.check([values for position, values in valid], lock=True) if valid else {}
+    for index in sorted(errors, reverse=True):
+        position, values = valid.pop(index)
+        results[position].update({'status': 'rejected', 'errors': errors[index]})
+
+    span = timedelta(minutes=SHOW_MAX_DURATION)
+    venues, artists = Bookings(span), Bookings(span)
+    if valid:
+        for id, venue_id, artist_id, start, duration in booked_shows([values for position, values in valid], span):
+            start = as_utc(start)
+            venues.add(venue_id, start, show_end(start, duration), 'show %d' % id)
+            artists.add(artist_id, start, show_end(start, duration), 'show %d' % id)
+
+    shows = []
+    for position, values in valid:
+        start = values['start_time']
+        end = show_end(start, values['duration'])
+        errors = {}
+        booked = venues.conflicts(values['venue_id'], start, end)
+        if booked:
+            errors['venue_id'] = ['Venue is already booked at this time (%s).' % ', '.join(booked)]
+        booked = artists.conflicts(values['artist_id'], start, end)
+        if booked:
+            errors['artist_id'] = ['Artist is already booked at this time (%s).' % ', '.join(booked)]
+        if errors:
+            results[position].update({'status': 'rejected', 'errors': errors})
+            continue
+        label = 'row %d' % (offset + position)
+        venues.add(values['venue_id'], start, end, label)
+        artists.add(values['artist_id'], start, end, label)
+        shows.append((position, Show(**values)))
+
+    if dry_run or not shows:
+        db.session.rollback()
+        return results
+
+    db.session.add_all([show for position, show in shows])
+    db.session.flush()
+    refresh_show_counters(Venue, Show.venue_id, Venue.id.in_({show.venue_id for position, show in shows}))
+    refresh_show_counters(Artist, Show.artist_id, Artist.id.in_({show.artist_id for position, show in shows}))
+    db.session.commit()
+    for position, show in shows:
+        results[position].update({'status': 'scheduled', 'id': show.id})
+        publish('insert', show)
+    return results
+
+
+@click.command('schedule')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+@click.option('--dry-run', is_flag=True, help='Check the rows for conflicts without booking anything.')
+@with_appcontext
+def schedule_command(path, format, dry_run):
+    """Book shows from CSV or JSON lines, rejecting double bookings."""
+    limit = current_app.config['SCHEDULE_BATCH_LIMIT']
+    counts = {'scheduled': 0, 'valid': 0, 'rejected': 0}
+    offset = 0
+    for chunk in chunks(read_rows(path, format), limit):
+        results = schedule([row for line, row in chunk], dry_run, offset)
+        for (line, row), result in zip(chunk, results):
+            counts[result['status']] += 1
+            if result['status'] == 'rejected':
+                click.echo('row %d (line %d): %s' % (result['row'], line, json.dumps(result['errors'])), err=True)
+        offset += len(chunk)
+    click.echo('%d %s, %d rejected' % (counts['valid'] if dry_run else counts['scheduled'],
+                                       'valid' if dry_run else 'scheduled', counts['rejected']))
@@ -0,0 +1,174 @@
+import re
+from collections import defaultdict
+
+from flask import current_app, has_app_context
+from sqlalchemy import func, or_
+
+from cache import INDEX_TAGS, Watched
+from models import db, Venue, Artist, Genre, GENRE_LINKS, subscribe
+
+
+# ----------------------------------------------------------------------------#
+# Search.
+# ----------------------------------------------------------------------------#
+#
+# On PostgreSQL the name filter is an ILIKE served by a pg_trgm GIN index,
+# name/city are matched through a tsvector expression index and genres through
+# the genre association tables. The first two indexes are created by
+# migration, not by the models, because they only exist on PostgreSQL. Every
+# other database (SQLite in development and tests) gets the same behaviour
+# from an in-process n-gram inverted index.
+
+SEARCH_FIELDS = {
+    Venue: (Venue.name, Venue.city),
+    Artist: (Artist.name, Artist.city),
+}
+
+WORD_RE = re.compile(r'\w+')
+
+
+def search_document(model):
+    # Must stay identical to the indexed expression in the migration,
+    # otherwise PostgreSQL will not use the index.
+    name, city = SEARCH_FIELDS[model]
+    return func.to_tsvector('simple', func.coalesce(name, '') + ' ' + func.coalesce(city, ''))
+
+
+def escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_postgresql(model, term, limit):
+    document = search_document(model)
+    query = func.plainto_tsquery('simple', term)
+    rank = func.similarity(model.name, term) + func.ts_rank(document, query)
+    return model.query.filter(
+        or_(model.name.ilike('%' + escape_like(term) + '%', escape='\\'),
+            document.op('@@')(query),
+            model.genres.any(func.lower(Genre.name) == term.strip().lower()))
+    ).order_by(rank.desc(), model.id).limit(limit).all()
+
+
+# ----------------------------------------------------------------------------#
+# In-process fallback.
+# ----------------------------------------------------------------------------#
+
+def trigrams(text):
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def words(text):
+    return set(WORD_RE.findall(text.lower()))
+
+
+class NgramIndex(object):
+    # Inverted index from name trigrams and document words to ids. Substring
+    # candidates are the intersection of the term's trigram postings and are
+    # verified against the name, which mirrors the ILIKE + pg_trgm plan.
+
+    def __init__(self):
+        self.names = {}
+        self.grams = defaultdict(set)
+        self.words = defaultdict(set)
+        self.documents = {}
+
+    def add(self, id, name, *fields):
+        self.remove(id)
+        name = name or ''
+        document = words(' '.join([name] + [field or '' for field in fields]))
+        self.names[id] = name.lower()
+        self.documents[id] = document
+        for gram in trigrams(name):
+            self.grams[gram].add(id)
+        for word in document:
+            self.words[word].add(id)
+
+    def remove(self, id):
+        name = self.names.pop(id, None)
+        if name is None:
+            return
+        for gram in trigrams(name):
+            self.grams[gram].discard(id)
+        for word in self.documents.pop(id):
+            self.words[word].discard(id)
+
+    def name_matches(self, term):
+        grams = trigrams(term)
+        if grams:
+            candidates = set.intersection(*(self.grams.get(gram, set()) for gram in grams))
+        else:
+            # Terms shorter than a trigram cannot use the postings.
+            candidates = self.names
+        return {id for id in candidates if term in self.names[id]}
+
+    def search(self, term, limit):
+        term = term.lower().strip()
+        if not term:
+            return sorted(self.names)[:limit]
+        query_words = words(term)
+        word_matches = set.intersection(*(self.words.get(word, set()) for word in query_words)) \
+            if query_words else set()
+        query_grams = trigrams(term)
+
+        def rank(id):
+            name_grams = trigrams(self.names[id])
+            shared = len(query_grams & name_grams)
+            union = len(query_grams | name_grams) or 1
+            return -(shared / union + len(query_words & self.documents[id]) / (len(query_words) or 1)), id
+
+        return sorted(self.name_matches(term) | word_matches, key=rank)[:limit]
+
+
+def build_fallback_index(model):
+    index = NgramIndex()
+    genres = defaultdict(list)
+    link = GENRE_LINKS[model]
+    for id, name in db.session.query(link, Genre.name).join(Genre, Genre.id == link.table.c.genre_id):
+        genres[id].append(name)
+    for row in db.session.query(model.id, *SEARCH_FIELDS[model]):
+        index.add(*row, *genres[row.id])
+    return index
+
+
+def fallback_indexes(app):
+    # One index per model and app, each on the app's own database.
+    return app.extensions.setdefault('search', {})
+
+
+def fallback_index(model):
+    indexes = fallback_indexes(current_app)
+    if model not in indexes:
+        indexes[model] = Watched(INDEX_TAGS[model], lambda: build_fallback_index(model),
+                                 current_app.config['INDEX_CHECK_SECONDS'])
+    return indexes[model].get()
+
+
+@subscribe
+def update_fallback_index(action, instance):
+    # This process sees its own writes at once; other processes' writes
+    # rebuild the index on its next check.
+    watched = fallback_indexes(current_app).get(type(instance)) if has_app_context() else None
+    if watched is None or watched.value is None:
+        return
+    with watched.lock:
+        if action == 'delete':
+            watched.value.remove(instance.id)
+        else:
+            watched.value.add(instance.id, instance.name, instance.city, *[genre.name for genre in instance.genres])
+
+
+def search_fallback(model, term, limit):
+    ids = fallback_index(model).search(term, limit)
+    if not ids:
+        return []
+    rows = {row.id: row for row in model.query.filter(model.id.in_(ids))}
+    return [rows[id] for id in ids if id in rows]
+
+
+def search(model, term, limit=None):
+    if limit is None:
+        limit = current_app.config['SEARCH_RESULT_LIMIT']
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return search_postgresql(model, term, limit)
+    return search_fallback(model, term, limit)
@@ -0,0 +1,56 @@
+from flask import Blueprint, render_template, request, flash
+
+from cache import cache
+from conditional import conditional, shows_validators
+from feeds import shows_csv
+from forms import ShowForm
+from models import db, Show
+from pagination import request_page
+from scheduling import schedule
+
+shows = Blueprint('shows', __name__)
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@shows.route('/shows')
+@conditional(shows_validators)
+@cache.page(lambda: ['shows'])
+def index():
+    # displays list of shows at /shows
+    # TODO: replace with real venues data.
+    #       num_shows should be aggregated based on number of upcoming shows per venue.
+    page = request_page(Show.query.options(db.joinedload(Show.Venue), db.joinedload(Show.Artist)),
+                        (Show.start_time, Show.id))
+    data = list(map(Show.info, page.items))
+
+    return render_template('pages/shows.html', shows=data, page=page)
+
+
+@shows.route('/shows.csv')
+@conditional(shows_validators)
+def shows_export():
+    # every show as CSV, streamed; ?from= / ?to= narrow the window
+    return shows_csv()
+
+
+@shows.route('/shows/create')
+def create_shows():
+    # renders form. do not touch.
+    form = ShowForm()
+    return render_template('forms/new_show.html', form=form)
+
+
+@shows.route('/shows/create', methods=['POST'])
+def create_show_submission():
+    # called to create new shows in the db, upon submitting new show listing form
+    # a batch of one, so the form gets the same double-booking checks
+    result = schedule([request.form.to_dict()])[0]
+    if result['status'] == 'scheduled':
+        # on successful db insert, flash success
+        flash('Show was successfully listed!')
+    else:
+        flash('Show could not be listed. ' + ' '.join(
+            '%s: %s' % (field, message) for field, messages in result['errors'].items() for message in messages))
+    return render_template('pages/home.html')
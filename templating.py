@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from jinja2 import FileSystemBytecodeCache, TemplateSyntaxError
+
+
+# ----------------------------------------------------------------------------#
+# Template compilation.
+# ----------------------------------------------------------------------------#
+#
+# Jinja compiles a template to Python the first time it is rendered, which a
+# fresh worker pays for on its first request to each page. With
+# TEMPLATE_CACHE_DIR set, the compiled code is kept there as marshalled
+# bytecode (keyed by a checksum of the source, so an edited template is
+# simply compiled again), and `flask compile-templates` fills it at deploy
+# time. With TEMPLATE_PRELOAD, create_app() loads every template up front, so
+# gunicorn's preloaded master holds them all and the forked workers start
+# with nothing left to compile.
+
+TEMPLATE_SUFFIXES = ('.html',)
+
+
+def init_templates(app):
+    # Must run before anything touches app.jinja_env, which reads jinja_options
+    # once when it is created.
+    if app.config['TEMPLATE_CACHE_DIR']:
+        os.makedirs(app.config['TEMPLATE_CACHE_DIR'], exist_ok=True)
+        app.jinja_options = dict(app.jinja_options,
+                                 bytecode_cache=FileSystemBytecodeCache(app.config['TEMPLATE_CACHE_DIR']))
+
+
+def template_names(app):
+    return app.jinja_env.list_templates(filter_func=lambda name: name.endswith(TEMPLATE_SUFFIXES))
+
+
+def compile_templates(app):
+    # Loads every template into the environment (and the bytecode cache).
+    # Returns the names loaded and (name, error) for those that do not parse.
+    loaded, errors = [], []
+    for name in template_names(app):
+        try:
+            app.jinja_env.get_template(name)
+        except TemplateSyntaxError as e:
+            errors.append((name, e))
+        else:
+            loaded.append(name)
+    return loaded, errors
+
+
+@click.command('compile-templates')
+@with_appcontext
+def compile_templates_command():
+    """Compile every template, failing on syntax errors."""
+    started = time.perf_counter()
+    loaded, errors = compile_templates(current_app)
+    for name, error in errors:
+        click.echo('%s:%s: %s' % (name, error.lineno, error.message), err=True)
+    click.echo('%d templates compiled in %.0fms%s, %d failed' % (
+        len(loaded), (time.perf_counter() - started) * 1000,
+        ' into ' + current_app.config['TEMPLATE_CACHE_DIR'] if current_app.config['TEMPLATE_CACHE_DIR'] else '',
+        len(errors)))
+    if errors:
+        sys.exit(1)
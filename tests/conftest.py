@@ -0,0 +1,65 @@
+"""Fixtures for the behaviour tests.
+
+    python -m pytest tests
+
+Each test gets a fresh app with the testing config on its own in-memory
+SQLite database, with the app context pushed.
+"""
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+
+class TestConfig(config.TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    DATABASE_REPLICA_URLS = []
+    SQLALCHEMY_BINDS = {}
+    LOG_FILE = None
+    TEMPLATE_CACHE_DIR = None
+
+
+@pytest.fixture
+def settings():
+    # Overridden by tests that need other settings, such as a replica.
+    return TestConfig()
+
+
+@pytest.fixture
+def app(settings):
+    from app import create_app
+    from models import db
+    app = create_app(settings)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def count_statements():
+    # count_statements(call) -> how many SQL statements call() ran.
+    def count(call):
+        executed = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            executed.append(statement)
+        event.listen(Engine, 'before_cursor_execute', record)
+        try:
+            call()
+        finally:
+            event.remove(Engine, 'before_cursor_execute', record)
+        return len(executed)
+    return count
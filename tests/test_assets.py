@@ -0,0 +1,23 @@
+import pytest
+
+import assets
+
+
+@pytest.fixture
+def built(monkeypatch):
+    monkeypatch.setattr(assets, 'load_manifest', lambda: {'site.css': 'site.0123456789ab.css'})
+
+
+def test_bundle_is_concatenated_until_built(app, client):
+    response = client.get('/static/dist/site.css')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+
+def test_built_bundle_is_not_concatenated(app, client, built):
+    assert client.get('/static/dist/site.css').status_code == 404
+
+
+def test_built_bundle_is_concatenated_in_debug_mode(app, client, built):
+    app.debug = True
+    assert client.get('/static/dist/site.css').status_code == 200
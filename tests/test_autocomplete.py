@@ -0,0 +1,44 @@
+from autocomplete import PrefixIndex, completer
+from cache import INDEX_TAGS, cache
+from models import db, Venue, utc_now
+
+
+def suggest(client, q, type='venue'):
+    return [row['name'] for row in client.get('/api/autocomplete?type=%s&q=%s' % (type, q)).get_json()['data']]
+
+
+def test_load_matches_adding_one_by_one():
+    rows = [(3, 'The Musical Hop'), (1, 'Park Square Live Music & Coffee'), (2, None), (4, 'The Dueling Pianos Bar')]
+    loaded, added = PrefixIndex(), PrefixIndex()
+    loaded.load(rows)
+    for row in rows:
+        added.add(*row)
+    assert loaded.keys == added.keys
+    assert loaded.names == added.names
+
+
+def test_own_writes_are_suggested_at_once(app, client):
+    app.config['INDEX_CHECK_SECONDS'] = 3600
+    assert suggest(client, 'mus') == []
+    venue = Venue(name='The Musical Hop')
+    venue.insert()
+    assert suggest(client, 'mus') == ['The Musical Hop']
+    venue.delete()
+    assert suggest(client, 'mus') == []
+
+
+def test_other_processes_writes_are_suggested_after_the_next_check(app, client, count_statements):
+    Venue(name='The Musical Hop').insert()
+    assert suggest(client, 'hop') == ['The Musical Hop']
+    assert count_statements(lambda: suggest(client, 'hop')) == 0
+
+    db.session.execute(Venue.__table__.insert().values(name='Hop Scotch', upcoming_shows_count=0,
+                                                       updated_at=utc_now()))
+    cache.invalidate(INDEX_TAGS[Venue])
+    db.session.commit()
+
+    index = completer('venue').index
+    index.checked -= app.config['INDEX_CHECK_SECONDS'] - 1
+    assert suggest(client, 'hop') == ['The Musical Hop']
+    index.checked -= 1
+    assert sorted(suggest(client, 'hop')) == ['Hop Scotch', 'The Musical Hop']
@@ -0,0 +1,86 @@
+from datetime import timedelta
+
+import pytest
+
+from cache import MemoryCache, NullCache, cache
+from models import db, Venue, Artist, Show, Stamp, utc_now
+
+
+@pytest.fixture
+def settings(settings):
+    settings.CACHE_TYPE = 'memory'
+    return settings
+
+
+def add_venue(name, **values):
+    venue = Venue(name=name, city='Austin', state='TX', **values)
+    venue.insert()
+    return venue
+
+
+def stamps():
+    return {stamp.name: stamp.version for stamp in Stamp.query}
+
+
+def test_orm_writes_bump_the_tags_of_the_pages_showing_them(app):
+    venue = add_venue('The Musical Hop')
+    artist = Artist(name='Guns N Petals')
+    artist.insert()
+    assert stamps() == {'venues': 1, 'shows': 2, 'venue:%d' % venue.id: 1, 'artists': 1,
+                        'artist:%d' % artist.id: 1, 'index:venues': 1, 'index:artists': 1}
+
+    Show(venue_id=venue.id, artist_id=artist.id, start_time=utc_now() + timedelta(days=1)).insert()
+    assert stamps() == {'venues': 2, 'shows': 3, 'venue:%d' % venue.id: 2, 'artists': 1,
+                        'artist:%d' % artist.id: 2, 'index:venues': 1, 'index:artists': 1}
+
+    # The venue's artists list it, so their pages are bumped too.
+    venue.name = 'The Musical Hop Too'
+    venue.update()
+    assert stamps()['artist:%d' % artist.id] == 3
+
+
+def test_rolled_back_writes_bump_nothing(app):
+    add_venue('The Musical Hop')
+    before = stamps()
+    db.session.add(Venue(name='Never committed'))
+    db.session.flush()
+    db.session.rollback()
+    db.session.commit()
+    assert stamps() == before
+
+
+def test_write_committed_elsewhere_reaches_cached_page(app, client):
+    # Another worker or a CLI command holds no part of this process's cache:
+    # all it shares is the database.
+    add_venue('The Musical Hop')
+    assert 'The Musical Hop' in client.get('/venues').get_data(as_text=True)
+    assert 'The Dueling Pianos Bar' not in client.get('/venues').get_data(as_text=True)
+    hits = cache.stats['hits']
+
+    db.engine.execute(Venue.__table__.insert().values(name='The Dueling Pianos Bar', city='Austin', state='TX',
+                                                      upcoming_shows_count=0, updated_at=utc_now()))
+    assert 'The Dueling Pianos Bar' not in client.get('/venues').get_data(as_text=True)
+    assert cache.stats['hits'] == hits + 1
+
+    db.engine.execute(Stamp.__table__.update().where(Stamp.name == 'venues').values(version=Stamp.version + 1))
+    assert 'The Dueling Pianos Bar' in client.get('/venues').get_data(as_text=True)
+
+
+def test_detail_page_expires_when_its_next_show_starts(app, client):
+    venue = add_venue('The Musical Hop')
+    artist = Artist(name='Guns N Petals')
+    artist.insert()
+    Show(venue_id=venue.id, artist_id=artist.id, start_time=utc_now() + timedelta(seconds=30)).insert()
+    client.get('/venues/%d' % venue.id)
+    expires, value = cache.backend.entries['page:/venues/%d?' % venue.id]
+    assert expires - utc_now().timestamp() <= 30
+
+
+def test_each_app_keeps_its_own_backend(app, settings):
+    from app import create_app
+    settings.CACHE_TYPE = 'null'
+    other = create_app(settings)
+    with other.app_context():
+        assert isinstance(cache.backend, NullCache)
+    assert isinstance(cache.backend, MemoryCache)
+    assert cache.stats is not other.extensions['cache']['stats']
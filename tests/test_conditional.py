@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+import pytest
+
+import conditional
+from models import db, Venue, Artist, Show, utc_now
+
+
+@pytest.fixture
+def settings(settings):
+    settings.CACHE_TYPE = 'memory'
+    return settings
+
+
+@pytest.fixture
+def booked(app):
+    venue = Venue(name='The Musical Hop', city='Austin', state='TX')
+    venue.insert()
+    artist = Artist(name='Guns N Petals')
+    artist.insert()
+    show = Show(venue_id=venue.id, artist_id=artist.id, start_time=utc_now() + timedelta(hours=1))
+    show.insert()
+    return venue, artist, show
+
+
+def add_venues(count):
+    now = utc_now()
+    db.session.execute(Venue.__table__.insert(), [{
+        'name': 'Venue %d' % number, 'city': 'Austin', 'state': 'TX', 'upcoming_shows_count': 0,
+        'updated_at': now,
+    } for number in range(count)])
+    db.session.commit()
+
+
+@pytest.mark.parametrize('url', ['/venues', '/artists', '/shows', '/venues/1', '/artists/1'])
+def test_revalidation_and_cache_hits_are_one_statement(booked, client, count_statements, url):
+    etag = client.get(url).headers['ETag']
+    assert count_statements(lambda: client.get(url, headers={'If-None-Match': etag})) == 1
+    assert count_statements(lambda: client.get(url)) == 1
+
+    add_venues(500)
+    etag = client.get(url).headers['ETag']
+    assert count_statements(lambda: client.get(url, headers={'If-None-Match': etag})) == 1
+    assert count_statements(lambda: client.get(url)) == 1
+
+
+def test_writes_change_the_etag_of_the_pages_showing_them(booked, client):
+    venue, artist, show = booked
+    urls = ['/venues', '/artists', '/shows', '/venues/%d' % venue.id, '/artists/%d' % artist.id]
+    before = {url: client.get(url).headers['ETag'] for url in urls}
+
+    venue.name = 'The Musical Hop Too'
+    venue.update()
+    after = {url: client.get(url).headers['ETag'] for url in urls}
+    assert [url for url in urls if after[url] != before[url]] == [
+        '/venues', '/shows', '/venues/%d' % venue.id, '/artists/%d' % artist.id]
+
+
+def test_detail_etag_changes_when_a_show_starts(booked, client, monkeypatch):
+    venue, artist, show = booked
+    response = client.get('/venues/%d' % venue.id)
+    etag, last_modified = response.headers['ETag'], response.last_modified
+    assert client.get('/venues/%d' % venue.id, headers={'If-None-Match': etag}).status_code == 304
+
+    later = utc_now() + timedelta(hours=2)
+    monkeypatch.setattr(conditional, 'utc_now', lambda: later)
+    response = client.get('/venues/%d' % venue.id, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.last_modified > last_modified
@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+import pytest
+
+from cache import cache
+from counters import sweep
+from models import db, Venue, Artist, Show, utc_now
+
+
+@pytest.fixture
+def settings(settings):
+    settings.CACHE_TYPE = 'memory'
+    return settings
+
+
+def test_sweep_refreshes_the_cached_venue_directory(app, client):
+    venue = Venue(name='The Musical Hop', city='Austin', state='TX')
+    venue.insert()
+    artist = Artist(name='Guns N Petals')
+    artist.insert()
+    Show(venue_id=venue.id, artist_id=artist.id, start_time=utc_now() + timedelta(minutes=5)).insert()
+    assert db.session.query(Venue.upcoming_shows_count).scalar() == 1
+
+    first = client.get('/venues')
+    assert client.get('/venues', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+    client.get('/venues')
+    misses = cache.stats['misses']
+
+    # As if run from cron, once the show has started.
+    assert sweep(utc_now() + timedelta(minutes=10)) == {'venues': 1, 'artists': 1}
+    assert db.session.query(Venue.upcoming_shows_count).scalar() == 0
+
+    second = client.get('/venues', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert second.headers['ETag'] != first.headers['ETag']
+    assert cache.stats['misses'] == misses + 1, 'the directory came from the cache'
+
+
+def test_moving_a_show_refreshes_both_sides(app):
+    venues = [Venue(name='The Musical Hop'), Venue(name='The Dueling Pianos Bar')]
+    artists = [Artist(name='Guns N Petals'), Artist(name='Matt Quevedo')]
+    for row in venues + artists:
+        row.insert()
+    start = utc_now() + timedelta(days=1)
+    show = Show(venue_id=venues[0].id, artist_id=artists[0].id, start_time=start)
+    show.insert()
+
+    show.venue_id, show.artist_id = venues[1].id, artists[1].id
+    show.update()
+
+    def counters(model):
+        return [(count, next_show and next_show.replace(tzinfo=None)) for count, next_show in
+                db.session.query(model.upcoming_shows_count, model.next_show_time).order_by(model.id)]
+    expected = [(0, None), (1, start.replace(tzinfo=None))]
+    assert counters(Venue) == expected
+    assert counters(Artist) == expected
@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from models import db, Venue, Genre, venue_genres, utc_now
+from pagination import encode_cursor
+
+CITIES = [('San Francisco', 'CA'), ('New York', 'NY'), ('Austin', 'TX'), ('Seattle', 'WA')]
+
+
+def add_venues(count):
+    # count more venues spread over CITIES, all tagged Jazz.
+    start = db.session.query(db.func.count(Venue.id)).scalar()
+    now = utc_now()
+    genre = Genre.lookup(['Jazz'])[0]
+    db.session.flush()
+    db.session.execute(Venue.__table__.insert(), [{
+        'id': start + number + 1, 'name': 'Venue %d' % (start + number), 'city': CITIES[number % 4][0],
+        'state': CITIES[number % 4][1], 'upcoming_shows_count': number % 3, 'updated_at': now,
+    } for number in range(count)])
+    db.session.execute(venue_genres.insert(), [{'venue_id': start + number + 1, 'genre_id': genre.id}
+                                               for number in range(count)])
+    db.session.commit()
+
+
+@pytest.mark.parametrize('url', ['/venues', '/venues?genre=Jazz'])
+def test_directory_statements_do_not_grow_with_venues(app, client, count_statements, url):
+    # Every venue on one page, so a per-venue or per-area query would show.
+    app.config['LISTING_PAGE_SIZE'] = 1000
+
+    def get():
+        response = client.get(url)
+        assert response.status_code == 200
+        return response
+
+    add_venues(20)
+    few = count_statements(get)
+    assert get().get_data(as_text=True).count('/venues/') >= 20
+
+    add_venues(80)
+    many = count_statements(get)
+    assert get().get_data(as_text=True).count('/venues/') >= 100
+
+    assert many == few
+
+
+def query_plans(client, url):
+    # SQLite's plan for every statement the request ran with a LIMIT.
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'LIMIT' in statement:
+            executed.append((statement, parameters))
+    event.listen(Engine, 'before_cursor_execute', record)
+    try:
+        assert client.get(url).status_code == 200
+    finally:
+        event.remove(Engine, 'before_cursor_execute', record)
+    assert executed
+    cursor = db.session.connection().connection.cursor()
+    return [' / '.join(row[-1] for row in cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters))
+            for statement, parameters in executed]
+
+
+@pytest.mark.parametrize('url', ['/venues', '/venues?after=' + encode_cursor(['CA', 'San Francisco', 1]), '/shows'])
+def test_listing_pages_are_read_in_index_order(app, client, url):
+    add_venues(20)
+    for plan in query_plans(client, url):
+        assert 'USING INDEX ix_' in plan and 'TEMP B-TREE' not in plan, plan
@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+import pytest
+
+from models import Venue, Artist, Show, Genre, utc_now
+
+VENUES = [
+    # name, city, state, seeking_talent, genre, days until its show
+    ('The Musical Hop', 'San Francisco', 'CA', True, 'Jazz', 3),
+    ('Park Square Live Music & Coffee', 'San Francisco', 'CA', False, 'Rock n Roll', 20),
+    ('The Dueling Pianos Bar', 'Oakland', 'CA', True, 'Jazz', 60),
+    ('The Blue Note', 'New York', 'NY', False, 'Jazz', -5),
+]
+
+
+@pytest.fixture
+def venues(app):
+    artist = Artist(name='Guns N Petals', city='San Francisco', state='CA')
+    artist.insert()
+    now = utc_now()
+    for name, city, state, seeking_talent, genre, days in VENUES:
+        venue = Venue(name=name, city=city, state=state, seeking_talent=seeking_talent,
+                      genres=Genre.lookup([genre]))
+        venue.insert()
+        Show(venue_id=venue.id, artist_id=artist.id, start_time=now + timedelta(days=days)).insert()
+
+
+def browse(client, query=''):
+    response = client.get('/api/browse/venues' + query)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def counts(facet):
+    return [(row['value'], row['count']) for row in facet]
+
+
+@pytest.mark.parametrize('query, error', [
+    ('?seeking_talent=maybe', 'seeking_talent must be true or false'),
+    ('?upcoming_within=soon', 'upcoming_within must be a number of days'),
+    ('?upcoming_within=-1', 'upcoming_within must be a number of days'),
+])
+def test_bad_selection_is_rejected(venues, client, query, error):
+    response = client.get('/api/browse/venues' + query)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': error}
+
+
+def test_selection_is_parsed(venues, client):
+    result = browse(client, '?state=CA&seeking_talent=1&genre=Jazz&upcoming_within=90&page=2')
+    assert result['selection'] == {'state': 'CA', 'seeking_talent': True, 'genre': 'Jazz', 'upcoming_within': 90}
+    assert [row['name'] for row in result['data']] == ['The Musical Hop', 'The Dueling Pianos Bar']
+    assert client.get('/api/browse/concerts').status_code == 404
+
+
+def test_facet_counts_leave_out_their_own_selection(venues, client):
+    facets = browse(client, '?state=CA')['facets']
+    # Every state still shows, so another can be picked; the rest count CA only.
+    assert counts(facets['state']) == [('CA', 3), ('NY', 1)]
+    assert counts(facets['city']) == [('San Francisco', 2), ('Oakland', 1)]
+    assert counts(facets['seeking_talent']) == [(True, 2), (False, 1)]
+    assert counts(facets['genre']) == [('Jazz', 2), ('Rock n Roll', 1)]
+
+    facets = browse(client, '?state=CA&city=Oakland')['facets']
+    assert counts(facets['city']) == [('San Francisco', 2), ('Oakland', 1)]
+    assert counts(facets['state']) == [('CA', 1)]
+
+
+def test_upcoming_within_windows(venues, client):
+    result = browse(client)
+    assert counts(result['facets']['upcoming_within']) == [(7, 1), (30, 2), (90, 3)]
+
+    result = browse(client, '?upcoming_within=30')
+    assert [row['name'] for row in result['data']] == ['The Musical Hop', 'Park Square Live Music & Coffee']
+    assert counts(result['facets']['upcoming_within']) == [(7, 1), (30, 2), (90, 3)]
+    assert counts(result['facets']['state']) == [('CA', 2)]
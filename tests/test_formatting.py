@@ -0,0 +1,21 @@
+from datetime import datetime, timedelta, timezone
+
+from formatting import DatetimeFormatter
+
+NOON = datetime(2035, 6, 1, 12, tzinfo=timezone.utc)
+BERLIN = timezone(timedelta(hours=2))
+
+
+def test_times_print_in_utc():
+    format = DatetimeFormatter('en_US')
+    assert format(NOON.astimezone(BERLIN), 'full') == '1, 2035 12:0'
+    assert format(NOON.replace(tzinfo=None), 'full') == '1, 2035 12:0'
+    assert format('2035-06-01T14:00:00+02:00', 'full') == '1, 2035 12:0'
+
+
+def test_equal_instants_share_a_cache_entry():
+    # Cached under the first offset seen, then asked for in UTC.
+    format = DatetimeFormatter('en_US')
+    format(NOON.astimezone(BERLIN))
+    assert format(NOON) == '1, 2035 12:0'
+    assert format.format.cache_info().currsize == 1
@@ -0,0 +1,44 @@
+import io
+import json
+
+from importer import import_file
+from models import Venue
+
+
+VENUE = {
+    'city': 'San Francisco', 'state': 'CA', 'address': '1015 Folsom Street', 'phone': '123-123-1234',
+    'genres': ['Jazz'], 'image_link': 'https://example.com/venue.jpg', 'facebook_link': 'https://facebook.com/venue',
+    'website': 'https://example.com',
+}
+
+
+def test_json_booleans_import_as_booleans(app, tmp_path):
+    path = tmp_path / 'venues.jsonl'
+    path.write_text(''.join(json.dumps(dict(VENUE, **row)) + '\n' for row in [
+        {'name': 'The Musical Hop', 'seeking_talent': True},
+        {'name': 'The Dueling Pianos Bar', 'seeking_talent': False},
+        {'name': 'Park Square Live Music & Coffee'},
+    ]))
+    assert import_file('venues', str(path), 100, io.StringIO()) == (3, 0)
+    assert dict(Venue.query.with_entities(Venue.name, Venue.seeking_talent)) == {
+        'The Musical Hop': True,
+        'The Dueling Pianos Bar': False,
+        'Park Square Live Music & Coffee': False,
+    }
+
+
+def test_malformed_json_lines_are_rejected(app, tmp_path):
+    path = tmp_path / 'venues.jsonl'
+    path.write_text('\n'.join([
+        json.dumps(dict(VENUE, name='The Musical Hop')),
+        '{"name": "The Dueling Pianos Bar",',
+        '["Park Square Live Music & Coffee"]',
+        json.dumps(dict(VENUE, name='Park Square Live Music & Coffee')),
+    ]) + '\n')
+    rejects = io.StringIO()
+    assert import_file('venues', str(path), 1, rejects) == (2, 2)
+    assert [json.loads(line) for line in rejects.getvalue().splitlines()] == [
+        {'line': 2, 'row': '{"name": "The Dueling Pianos Bar",', 'errors': {'row': ['Not a JSON object.']}},
+        {'line': 3, 'row': ['Park Square Live Music & Coffee'], 'errors': {'row': ['Not a JSON object.']}},
+    ]
+    assert Venue.query.count() == 2
@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from logs import request_log
+
+
+@pytest.fixture
+def settings(settings, tmp_path):
+    settings.LOG_FILE = str(tmp_path / 'fyyur.jsonl')
+    return settings
+
+
+def logged_paths(path):
+    request_log.handler.stop()  # writes out what is queued
+    with open(path) as f:
+        return [json.loads(line)['path'] for line in f]
+
+
+def test_log_follows_the_file_once_rotated(app, client, tmp_path):
+    path = tmp_path / 'fyyur.jsonl'
+    client.get('/')
+    assert logged_paths(path) == ['/']
+
+    # As logrotate does it: rename, and leave the path for the app to create.
+    path.rename(tmp_path / 'fyyur.jsonl.1')
+    client.get('/venues')
+    assert logged_paths(path) == ['/venues']
+    assert logged_paths(tmp_path / 'fyyur.jsonl.1') == ['/']
+
+
+def test_dash_logs_to_stdout(app, capsys):
+    app.config['LOG_FILE'] = '-'
+    request_log.init_app(app)
+    app.test_client().get('/')
+    request_log.handler.stop()
+    assert json.loads(capsys.readouterr().out)['path'] == '/'
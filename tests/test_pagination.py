@@ -0,0 +1,59 @@
+import re
+from urllib.parse import unquote
+
+from models import db, Venue, utc_now
+from pagination import encode_cursor
+
+AREAS = [(None, None), ('Austin', None), (None, 'CA'), ('Austin', 'TX'), ('San Francisco', 'CA')]
+
+
+def add_venues(count):
+    now = utc_now()
+    db.session.execute(Venue.__table__.insert(), [{
+        'id': number + 1, 'name': 'Venue %d' % number, 'city': AREAS[number % 5][0], 'state': AREAS[number % 5][1],
+        'upcoming_shows_count': 0, 'updated_at': now,
+    } for number in range(count)])
+    db.session.commit()
+
+
+def venue_ids(html):
+    return [int(id) for id in re.findall(r'href="/venues/(\d+)"', html)]
+
+
+def cursor(html, name):
+    match = re.search(r'[?&]%s=([^"&]+)' % name, html)
+    return match and unquote(match.group(1))
+
+
+def walk(client, url, name):
+    # Follows the Next (after) or Previous (before) links from url. Returns
+    # the venue ids of every page in the order they were listed, and the
+    # last page.
+    pages = []
+    while url:
+        html = client.get(url).get_data(as_text=True)
+        pages.append(venue_ids(html))
+        assert len(pages) <= 10, 'the listing came back to a page it had served'
+        url = '/venues?%s=%s' % (name, cursor(html, name)) if cursor(html, name) else None
+    return pages, html
+
+
+def test_directory_pages_through_venues_without_city_or_state(app, client):
+    app.config['LISTING_PAGE_SIZE'] = 3
+    add_venues(23)
+    forward, last = walk(client, '/venues', 'after')
+    assert sorted(sum(forward, [])) == list(range(1, 24))
+
+    backward, first = walk(client, '/venues?before=' + cursor(last, 'before'), 'before')
+    assert list(reversed(backward)) == forward[:-1]
+
+
+def test_bad_cursor_is_rejected(app, client):
+    add_venues(5)
+    for bad in ('not-base64!', encode_cursor(['CA']), encode_cursor([1, 2, 3]), encode_cursor(['', '', 'x']),
+                encode_cursor([None, None, 1])):
+        assert client.get('/venues?after=' + bad).status_code == 400
+        assert client.get('/artists?before=' + bad).status_code == 400
+    response = client.get('/api/browse/venues?after=' + encode_cursor(['x']))
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid page cursor.'}
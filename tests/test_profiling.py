@@ -0,0 +1,63 @@
+import re
+
+import pytest
+
+from models import Venue
+from profiling import profiler
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats():
+    # The profiler is shared by every app in the process.
+    with profiler.lock:
+        profiler.stats.clear()
+
+
+def server_timing(response):
+    match = re.match(r'db;dur=([\d.]+);desc="(\d+) queries", render;dur=([\d.]+), total;dur=([\d.]+)$',
+                     response.headers['Server-Timing'])
+    db, queries, render, total = match.groups()
+    return float(db), int(queries), float(render), float(total)
+
+
+def test_server_timing_header(app, client, count_statements):
+    Venue(name='The Musical Hop', city='San Francisco', state='CA').insert()
+    responses = []
+    queries = count_statements(lambda: responses.append(client.get('/venues')))
+    db, counted, render, total = server_timing(responses[0])
+    assert counted == queries > 0
+    assert 0 < db < total and 0 < render < total
+
+    app.config['SERVER_TIMING'] = False
+    assert 'Server-Timing' not in client.get('/venues').headers
+
+
+def test_stats_add_up_per_endpoint(app, client):
+    Venue(name='The Musical Hop', city='San Francisco', state='CA').insert()
+    client.get('/venues')
+    client.get('/venues')
+    client.get('/artists')
+    stats = client.get('/api/profile/stats').get_json()
+    assert stats['venues.index']['requests'] == 2
+    assert stats['artists.index']['requests'] == 1
+    assert stats['venues.index']['total_ms'] >= stats['venues.index']['max_ms'] > 0
+
+
+def test_streamed_body_queries_are_counted(app, client, count_statements):
+    Venue(name='The Musical Hop', city='San Francisco', state='CA').insert()
+    queries = count_statements(lambda: client.get('/api/v1/venues', buffered=True))
+    stats = profiler.totals()['api.list_venues']
+    assert stats['requests'] == 1
+    assert stats['queries'] == queries > 0
+
+
+def test_slow_requests_are_profiled(app, client, tmp_path):
+    app.config['PROFILE_DIR'] = str(tmp_path)
+    app.config['PROFILE_THRESHOLD_MS'] = 60 * 1000
+    client.get('/venues')
+    assert list(tmp_path.iterdir()) == []
+
+    app.config['PROFILE_THRESHOLD_MS'] = 1
+    client.get('/venues')
+    [dumped] = tmp_path.iterdir()
+    assert re.match(r'\d{8}T\d{6}-venues\.index-\d+ms-\d+\.prof$', dumped.name)
@@ -0,0 +1,63 @@
+import pytest
+
+import routing
+from models import db, Venue, utc_now
+
+
+@pytest.fixture
+def settings(settings, tmp_path):
+    settings.SQLALCHEMY_DATABASE_URI = 'sqlite:///%s' % (tmp_path / 'primary.db')
+    settings.SQLALCHEMY_BINDS = {'replica0': 'sqlite:///%s' % (tmp_path / 'replica.db')}
+    return settings
+
+
+@pytest.fixture
+def replica(app):
+    # Stands in for a replica that has not caught up: same tables, other rows.
+    engine = db.get_engine(app, bind='replica0')
+    db.Model.metadata.create_all(engine)
+    engine.execute(Venue.__table__.insert().values(name='Only On The Replica', city='Austin', state='TX',
+                                                   upcoming_shows_count=0, updated_at=utc_now()))
+    return engine
+
+
+def venue_names(engine):
+    return {name for name, in engine.execute(Venue.__table__.select().with_only_columns([Venue.name]))}
+
+
+def create_venue(client, name):
+    return client.post('/venues/create', data={
+        'name': name, 'city': 'Austin', 'state': 'TX', 'address': '1015 Folsom Street', 'phone': '123-123-1234',
+        'genres': 'Jazz', 'image_link': '', 'facebook_link': '', 'website': '', 'seeking_description': '',
+    })
+
+
+def test_reads_go_to_the_replica(app, client, replica):
+    Venue(name='The Musical Hop', city='Austin', state='TX').insert()
+    html = client.get('/venues').get_data(as_text=True)
+    assert 'Only On The Replica' in html
+    assert 'The Musical Hop' not in html
+
+
+def test_writes_go_to_the_primary(app, client, replica):
+    assert create_venue(client, 'The Musical Hop').status_code == 200
+    assert 'The Musical Hop' in venue_names(db.engine)
+    assert 'The Musical Hop' not in venue_names(replica)
+
+
+def test_reads_stay_on_the_primary_for_a_while_after_a_write(app, client, replica, monkeypatch):
+    now = 1000000.0
+    monkeypatch.setattr(routing.time, 'time', lambda: now)
+    create_venue(client, 'The Musical Hop')
+    with client.session_transaction() as session:
+        assert session[routing.STICKY_KEY] == now + app.config['REPLICA_STICKY_SECONDS']
+
+    now += app.config['REPLICA_STICKY_SECONDS'] - 1
+    html = client.get('/venues').get_data(as_text=True)
+    assert 'The Musical Hop' in html
+    assert 'Only On The Replica' not in html
+
+    now += 2
+    html = client.get('/venues').get_data(as_text=True)
+    assert 'The Musical Hop' not in html
+    assert 'Only On The Replica' in html
@@ -0,0 +1,79 @@
+import sqlite3
+from datetime import datetime, timezone
+
+import pytest
+
+from models import db, Venue, Artist, Show
+from scheduling import schedule
+
+EIGHT_PM = datetime(2035, 6, 1, 20, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def booked(app):
+    # Two venues and two artists; the first pair has a show 20:00-22:00.
+    venues = [Venue(name='The Musical Hop'), Venue(name='The Dueling Pianos Bar')]
+    artists = [Artist(name='Guns N Petals'), Artist(name='Matt Quevedo')]
+    for row in venues + artists:
+        row.insert()
+    show = Show(venue_id=venues[0].id, artist_id=artists[0].id, start_time=EIGHT_PM, duration=120)
+    show.insert()
+    return [venue.id for venue in venues], [artist.id for artist in artists], show.id
+
+
+def row(venue_id, artist_id, start, duration=60):
+    return {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2035-06-01 %s:00' % start,
+            'duration': duration}
+
+
+def test_overlapping_shows_are_rejected(booked):
+    (venue, other_venue), (artist, other_artist), show = booked
+    results = schedule([row(venue, other_artist, '21:00'), row(other_venue, artist, '19:30'),
+                        row(venue, artist, '20:00', 240)], dry_run=True)
+    assert [result['status'] for result in results] == ['rejected'] * 3
+    assert results[0]['errors'] == {'venue_id': ['Venue is already booked at this time (show %d).' % show]}
+    assert results[1]['errors'] == {'artist_id': ['Artist is already booked at this time (show %d).' % show]}
+    assert set(results[2]['errors']) == {'venue_id', 'artist_id'}
+
+
+def test_touching_shows_are_scheduled(booked):
+    (venue, other_venue), (artist, other_artist), show = booked
+    results = schedule([row(venue, other_artist, '19:00'), row(venue, artist, '22:00')])
+    assert [result['status'] for result in results] == ['scheduled', 'scheduled']
+    assert Show.query.count() == 3
+
+
+def test_separate_shows_are_scheduled(booked):
+    (venue, other_venue), (artist, other_artist), show = booked
+    results = schedule([row(other_venue, other_artist, '20:00', 120), row(venue, other_artist, '23:00'),
+                        row(other_venue, artist, '18:00')])
+    assert [result['status'] for result in results] == ['scheduled'] * 3
+
+
+def test_rows_of_one_batch_are_checked_against_each_other(booked):
+    (venue, other_venue), (artist, other_artist), show = booked
+    results = schedule([row(other_venue, other_artist, '12:00', 120), row(other_venue, artist, '13:00'),
+                        row(venue, other_artist, '13:59')])
+    assert [result['status'] for result in results] == ['scheduled', 'rejected', 'rejected']
+    assert results[1]['errors'] == {'venue_id': ['Venue is already booked at this time (row 0).']}
+    assert results[2]['errors'] == {'artist_id': ['Artist is already booked at this time (row 0).']}
+
+
+class TestSQLite(object):
+
+    @pytest.fixture
+    def settings(self, settings, tmp_path):
+        settings.SQLALCHEMY_DATABASE_URI = 'sqlite:///%s' % (tmp_path / 'fyyur.db')
+        return settings
+
+    def test_check_takes_the_write_lock(self, booked, settings):
+        # Without it two workers could both find a slot free, then both book it.
+        (venue, other_venue), (artist, other_artist), show = booked
+        from importer import IMPORTERS
+        IMPORTERS['shows'].check([{'venue_id': venue, 'artist_id': artist}], lock=True)
+        other = sqlite3.connect(settings.SQLALCHEMY_DATABASE_URI[len('sqlite:///'):], timeout=0)
+        with pytest.raises(sqlite3.OperationalError, match='locked'):
+            other.execute('BEGIN IMMEDIATE')
+        db.session.rollback()
+        other.execute('BEGIN IMMEDIATE')
+        other.rollback()
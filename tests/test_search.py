@@ -0,0 +1,55 @@
+from app import create_app
+from cache import INDEX_TAGS, cache
+from models import db, Venue, utc_now
+from search import search
+
+
+def names(model, term):
+    return [row.name for row in search(model, term)]
+
+
+def test_each_app_searches_its_own_database(app, settings):
+    Venue(name='The Musical Hop').insert()
+    assert names(Venue, 'hop') == ['The Musical Hop']
+
+    # Sessions are per thread, not per app.
+    db.session.remove()
+    other = create_app(settings)
+    with other.app_context():
+        db.create_all()
+        Venue(name='Park Square Live Music & Coffee').insert()
+        assert names(Venue, 'hop') == []
+        assert names(Venue, 'music') == ['Park Square Live Music & Coffee']
+        db.session.remove()
+        db.drop_all()
+    db.session.remove()
+
+    assert names(Venue, 'music') == ['The Musical Hop']
+
+
+def test_own_writes_are_searchable_at_once(app):
+    app.config['INDEX_CHECK_SECONDS'] = 3600
+    assert names(Venue, 'hop') == []
+    venue = Venue(name='The Musical Hop')
+    venue.insert()
+    assert names(Venue, 'hop') == ['The Musical Hop']
+    venue.name = 'The Dueling Pianos Bar'
+    venue.update()
+    assert names(Venue, 'hop') == []
+
+
+def test_other_processes_writes_are_searchable_after_the_next_check(app):
+    Venue(name='The Musical Hop').insert()
+    assert names(Venue, 'hop') == ['The Musical Hop']
+
+    # A bulk write from another process: no change event reaches this one.
+    db.session.execute(Venue.__table__.insert().values(name='The Hop Shop', upcoming_shows_count=0,
+                                                       updated_at=utc_now()))
+    cache.invalidate(INDEX_TAGS[Venue])
+    db.session.commit()
+
+    watched = app.extensions['search'][Venue]
+    watched.checked -= app.config['INDEX_CHECK_SECONDS'] - 1
+    assert names(Venue, 'hop') == ['The Musical Hop']
+    watched.checked -= 1
+    assert sorted(names(Venue, 'hop')) == ['The Hop Shop', 'The Musical Hop']
@@ -0,0 +1,175 @@
+from flask import Blueprint, render_template, request, flash, redirect, url_for
+from sqlalchemy.exc import SQLAlchemyError
+
+from cache import cache
+from conditional import conditional, venues_validators, venue_validators
+from directory import venue_directory
+from feeds import venue_calendar
+from forms import VenueForm
+from loaders import load_venue_detail
+from models import db, Venue, Show, Genre, next_show_start
+from routing import replica_reads
+from search import search
+
+venues = Blueprint('venues', __name__)
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@venues.route('/venues')
+@conditional(venues_validators)
+@cache.page(lambda: ['venues'])
+def index():
+    # One keyset page of city/state -> venues, in (state, city, id) order;
+    # num_upcoming_shows is the maintained upcoming_shows_count column.
+    data, page = venue_directory(genre=request.args.get('genre'))
+    return render_template('pages/venues.html', areas=data, page=page)
+
+
+@venues.route('/venues/search', methods=['POST'])
+@replica_reads
+def search_venues():
+    # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
+    # seach for Hop should return "The Musical Hop".
+    # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+    venue_response = search(Venue, request.form['search_term'])
+    venue_list = list(map(Venue.short_response, venue_response))
+    response = {
+        'count': len(venue_list),
+        'data': venue_list
+    }
+    return render_template('pages/search_venues.html', results=response,
+                           search_term=request.form.get('search_term', ''))
+
+
+@venues.route('/venues/<int:venue_id>')
+@conditional(venue_validators)
+@cache.page(lambda venue_id: ['venue:%d' % venue_id],
+            expires=lambda venue_id: next_show_start(Show.venue_id, venue_id))
+def show_venue(venue_id):
+    # shows the venue page with the given venue_id
+    venues_info = load_venue_detail(venue_id)
+    if venues_info:
+        return render_template('pages/show_venue.html', venue=venues_info)
+    return render_template('errors/404.html')
+
+
+@venues.route('/venues/<int:venue_id>/shows.ics')
+@conditional(venue_validators)
+def venue_shows_calendar(venue_id):
+    # iCalendar feed of the venue's shows; ?from= / ?to= narrow the window
+    return venue_calendar(venue_id)
+
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+@venues.route('/venues/create', methods=['GET'])
+def create_venue_form():
+    form = VenueForm()
+    return render_template('forms/new_venue.html', form=form)
+
+
+@venues.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+    # TODO: insert form data as a new Venue record in the db, instead
+    # TODO: modify data to be the data object returned from db insertion
+    seeking_talent = False
+    talent = request.form.get('seeking_talent')
+    if talent == "on":
+        seeking_talent = True
+    elif talent == "off":
+        seeking_talent = False
+    try:
+        new_venue = Venue(
+            name=request.form['name'],
+            city=request.form['city'],
+            state=request.form['state'],
+            address=request.form['address'],
+            phone=request.form['phone'],
+            image_link=request.form['image_link'],
+            facebook_link=request.form['facebook_link'],
+            website=request.form['website'],
+            genres=Genre.lookup(request.form.getlist('genres')),
+            seeking_talent=seeking_talent,
+            seeking_description=request.form['seeking_description']
+        )
+        new_venue.insert()
+        # on successful db insert, flash success
+        flash('Venue ' + request.form['name'] + ' was successfully listed!')
+    except SQLAlchemyError:
+        # TODO: on unsuccessful db insert, flash an error instead.
+        flash('An error occurred. Venue ' + request.form['name'] + ' could not be listed.')
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    return render_template('pages/home.html')
+
+
+@venues.route('/delete_venue/<int:venue_id>')
+def delete_venue(venue_id):
+    # TODO: Complete this endpoint for taking a venue_id, and using
+    # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+    try:
+        del_venue = Venue.query.filter_by(id=venue_id).first()
+        del_venue.delete()
+    except:
+        db.session.rollback()
+    finally:
+        db.session.close()
+
+    # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+    # clicking that button delete it from the db then redirect the user to the homepage
+    return redirect(url_for('index'))
+
+
+#  Update
+#  ----------------------------------------------------------------
+
+@venues.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+    form = VenueForm()
+    venue_query = Venue.query.get(venue_id)
+    if venue_query:
+        venue_info = Venue.info(venue_query)
+        form.name.data = venue_info['name']
+        form.genres.data = venue_info['genres']
+        form.address.data = venue_info['address']
+        form.state.data = venue_info['state']
+        form.city.data = venue_info['city']
+        form.facebook_link.data = venue_info['facebook_link']
+        form.image_link.data = venue_info['image_link']
+        form.phone.data = venue_info['phone']
+        form.website.data = venue_info['website']
+        form.seeking_talent.data = venue_info['seeking_talent']
+        form.seeking_description.data = venue_info['seeking_description']
+        # TODO: populate form with values from venue with ID <venue_id>
+        return render_template('forms/edit_venue.html', form=form, venue=venue_info)
+    return render_template('errors/404.html')
+
+
+@venues.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+    # TODO: take values from the form submitted, and update existing
+    # venue record with ID <venue_id> using the new attributes
+    form = VenueForm(request.form)
+    venue_query = Venue.query.get(venue_id)
+
+    seeking_talent = False
+    talent = request.form.get('seeking_talent')
+    if talent == "off":
+        seeking_talent = False
+    elif talent == "on":
+        seeking_talent = True
+    setattr(venue_query, 'name', request.form['name'])
+    setattr(venue_query, 'website', request.form['website'])
+    setattr(venue_query, 'facebook_link', request.form['facebook_link'])
+    setattr(venue_query, 'image_link', request.form['image_link'])
+    setattr(venue_query, 'seeking_talent', seeking_talent)
+    setattr(venue_query, 'seeking_description', request.form['seeking_description'])
+    setattr(venue_query, 'phone', request.form['phone'])
+    setattr(venue_query, 'state', request.form['state'])
+    setattr(venue_query, 'city', request.form['city'])
+    setattr(venue_query, 'genres', Genre.lookup(request.form.getlist('genres')))
+    setattr(venue_query, 'address', request.form['address'])
+    Venue.update(venue_query)
+    return redirect(url_for('venues.show_venue', venue_id=venue_id))
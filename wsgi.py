@@ -0,0 +1,8 @@
+import os
+
+# Production settings unless the environment picks another config.
+os.environ.setdefault('FYYUR_CONFIG', 'production')
+
+from app import create_app
+
+app = create_app()